@@ -1,9 +1,16 @@
 from __future__ import annotations
 
+import asyncio
+from array import array
+import base64
+from collections import Counter
 from contextlib import asynccontextmanager
-from datetime import datetime
+from functools import lru_cache
+from datetime import date, datetime, timedelta
 import json
 from json import JSONEncoder
+import hashlib
+import re
 from motor.motor_asyncio import AsyncIOMotorClient
 import uvicorn
 from fastapi import FastAPI, HTTPException, Query
@@ -11,11 +18,26 @@ import asyncpg
 from elasticsearch import AsyncElasticsearch
 import aioredis
 from neo4j import AsyncGraphDatabase
-from pypika import Query as PypikaQuery, Table, Field, Case, Parameter
+from pypika import Query as PypikaQuery, Table, Field, Case, Parameter, CustomFunction
 from pypika.functions import Count, Sum
 from pydantic import BaseModel, AnyHttpUrl, Field
 from pydantic_settings import BaseSettings
 import logging
+import sys
+import time
+
+from common.dataloader import DataLoader, dataloader_scope, request_loader
+from common.snapshot import AttendanceSnapshot, snapshot_version
+
+try:
+    import numpy as np
+except ImportError:  # снимок посещаемости необязателен: без NumPy отвечает только Neo4j
+    np = None
+
+try:
+    import snowballstemmer
+except ImportError:  # встроенный индекс материалов необязателен: без стеммера ищет только ES
+    snowballstemmer = None
 
 class CustomJSONEncoder(JSONEncoder):
     def default(self, obj):
@@ -33,14 +55,72 @@ if not logger.handlers:
     logger.propagate = False
 
 
-CACHE_TTL = 60
+CACHE_TTL = 60 * 60 * 6
+# Окно, захватывающее сегодняшний день, ещё пополняется посещениями
+LIVE_PERIOD_CACHE_TTL = 60
+# Закрытые периоды не меняются — их сбрасывает только инвалидация по тегам (main.py)
+HISTORICAL_CACHE_TTL = 60 * 60 * 24 * 30
+# Наборы тегов живут не меньше самой долгой записи, иначе запись «потеряется» для инвалидации
+CACHE_TAG_TTL = HISTORICAL_CACHE_TTL
+# Отрицательные ответы (404) кэшируются коротко: данные могут появиться в любой момент
+NEGATIVE_CACHE_TTL = 60 * 5
+NEGATIVE_CACHE_MARKER = "__not_found__"
+# Справочные сущности (student:<id>, dept:<id>) почти не меняются; student:<id>
+# сбрасывает main.py (invalidate_cache) при записи студентов и групп
+ENTITY_CACHE_TTL = 60 * 60 * 24 * 7
+STUDENT_ENTITY_FIELDS = ("code", "full_name", "group", "specialty", "dept_id")
+# Более длинные ключи заменяются хэшем
+MAX_CACHE_KEY_LENGTH = 200
+
+DATE_ARG_RE = re.compile(r"^\d{4}-\d{1,2}-\d{1,2}$")
+
+def normalize_term(term: str) -> str:
+    """Приведение поискового термина к каноничному виду: регистр и пробелы не важны"""
+    return " ".join(term.split()).casefold()
+
+def canonical_cache_arg(arg) -> str:
+    """Каноничное строковое представление аргумента ключа кэша"""
+    if arg is None:
+        return ""
+    if isinstance(arg, (date, datetime)):
+        return arg.isoformat()
+    if isinstance(arg, str):
+        if DATE_ARG_RE.match(arg.strip()):
+            parsed = parse_period_date(arg.strip())
+            if parsed is not None:
+                return parsed.isoformat()
+        return normalize_term(arg)
+    return str(arg)
 
 def generate_cache_key(prefix: str, *args) -> str:
-    """Генерация уникального ключа кэша из префикса и аргументов"""
-    key_parts = [prefix] + [str(arg) for arg in args]
+    """Генерация уникального ключа кэша из префикса и канонизированных аргументов"""
+    key_parts = [prefix] + [canonical_cache_arg(arg) for arg in args]
     key_string = ":".join(key_parts)
+    if len(key_string) > MAX_CACHE_KEY_LENGTH:
+        digest = hashlib.sha1(key_string.encode("utf-8")).hexdigest()
+        key_string = f"{prefix}:sha1:{digest}"
     return key_string
 
+def period_cache_ttl(start: date | None, end: date | None) -> int:
+    """TTL для отчёта за период: прошлое кэшируется надолго, текущее — коротко"""
+    today = date.today()
+    if end is not None and end < today:
+        return HISTORICAL_CACHE_TTL
+    if start is not None and start > today:
+        return CACHE_TTL
+    return LIVE_PERIOD_CACHE_TTL
+
+def parse_period_date(value: str) -> date | None:
+    """Разбор даты YYYY-MM-DD (допускается YYYY-M-D); при ошибке — None"""
+    try:
+        return datetime.strptime(value.strip(), "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+def cache_tag_key(tag: str) -> str:
+    """Ключ Redis-множества, хранящего ключи кэша, зависящие от тега"""
+    return f"cache_tag:{tag}"
+
 async def get_cached_data(redis, key: str):
     """Получение данных из Redis кэша"""
     data = await redis.get(key)
@@ -50,10 +130,24 @@ async def get_cached_data(redis, key: str):
     logger.info(f"Cache miss: {key}")
     return None
 
-async def set_cached_data(redis, key: str, data, ttl: int = CACHE_TTL):
-    """Сохранение данных в Redis кэш с указанным TTL"""
-    await redis.set(key, json.dumps(data, cls=CustomJSONEncoder), ex=ttl)
-    logger.info(f"Cached: {key}, TTL: {ttl}")
+async def set_cached_data(redis, key: str, data, ttl: int = CACHE_TTL, tags=()):
+    """Сохранение данных в Redis кэш с указанным TTL и привязкой к тегам сущностей"""
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.set(key, json.dumps(data, cls=CustomJSONEncoder), ex=ttl)
+        for tag in tags:
+            pipe.sadd(cache_tag_key(tag), key)
+            pipe.expire(cache_tag_key(tag), CACHE_TAG_TTL)
+        await pipe.execute()
+    logger.info(f"Cached: {key}, TTL: {ttl}, tags: {len(tags)}")
+
+async def set_negative_cache(redis, key: str, detail: str, tags=()):
+    """Кэширование ответа «не найдено» с коротким TTL"""
+    await set_cached_data(redis, key, {NEGATIVE_CACHE_MARKER: detail}, ttl=NEGATIVE_CACHE_TTL, tags=tags)
+
+def raise_if_negative(cached) -> None:
+    """Повторяет закэшированный 404 без обращения к хранилищам"""
+    if isinstance(cached, dict) and NEGATIVE_CACHE_MARKER in cached:
+        raise HTTPException(status_code=404, detail=cached[NEGATIVE_CACHE_MARKER])
 
 class Settings(BaseSettings):
     postgres_dsn: str = Field(..., env="POSTGRES_DSN")
@@ -63,6 +157,27 @@ class Settings(BaseSettings):
     neo4j_uri: str = Field(..., env="NEO4J_URI")
     neo4j_user: str = Field(..., env="NEO4J_USER")
     neo4j_password: str = Field(..., env="NEO4J_PASSWORD")
+    # прогрев кэша популярных отчётов
+    warmup_on_startup: bool = Field(True, env="WARMUP_ON_STARTUP")
+    warmup_concurrency: int = Field(4, env="WARMUP_CONCURRENCY")
+    warmup_popular_limit: int = Field(50, env="WARMUP_POPULAR_LIMIT")
+    warmup_reports: list[dict] = Field(
+        default_factory=lambda: [{"term": "введение", "start": "2023-09-01", "end": "2023-10-16"}],
+        env="WARMUP_REPORTS"
+    )
+    # источник посещаемости: "neo4j", "snapshot" (снимок в памяти, нужен NumPy),
+    # "bitmap" (битовые индексы в Redis) или "rollup" (недельные агрегаты в PostgreSQL)
+    attendance_engine: str = Field("neo4j", env="ATTENDANCE_ENGINE")
+    snapshot_refresh_seconds: int = Field(60, env="SNAPSHOT_REFRESH_SECONDS")
+    # встроенный индекс материалов вместо ES для коротких запросов (нужен snowballstemmer)
+    materials_index_enabled: bool = Field(False, env="MATERIALS_INDEX_ENABLED")
+    materials_index_refresh_seconds: int = Field(30, env="MATERIALS_INDEX_REFRESH_SECONDS")
+    materials_index_max_terms: int = Field(4, env="MATERIALS_INDEX_MAX_TERMS")
+    # фильтр словаря материалов: отсекает запросы без совпадений до ES (нужен snowballstemmer)
+    vocab_filter_enabled: bool = Field(False, env="VOCAB_FILTER_ENABLED")
+    vocab_filter_refresh_seconds: int = Field(30, env="VOCAB_FILTER_REFRESH_SECONDS")
+    # справочник кафедр в памяти: без change stream версия сверяется с этим интервалом
+    department_refresh_seconds: int = Field(60, env="DEPARTMENT_REFRESH_SECONDS")
 
     class Config:
         env_file = ".env"
@@ -71,8 +186,7 @@ class Settings(BaseSettings):
 
 settings = Settings()
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
+async def open_connections(app: FastAPI):
     app.state.db  = await asyncpg.create_pool(dsn=settings.postgres_dsn)
     app.state.es    = AsyncElasticsearch([str(settings.es_host)])
     app.state.redis = aioredis.from_url(settings.redis_dsn, decode_responses=True)
@@ -88,12 +202,50 @@ async def lifespan(app: FastAPI):
         raise
     app.state.mongo = mongo_client[mongo_client.get_default_database().name]
 
-    yield
+async def close_connections(app: FastAPI):
     await app.state.db.close()
     await app.state.es.close()
     await app.state.neo4j.close()
     await app.state.redis.close()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await open_connections(app)
+    app.state.warmup = WarmupProgress()
+    app.state.warmup_task = None
+    app.state.snapshot = None
+    app.state.snapshot_task = None
+    app.state.materials_index = None
+    app.state.materials_index_task = None
+    app.state.vocab_filter = None
+    app.state.vocab_filter_task = None
+    app.state.departments = None
+    app.state.departments_version = None
+    try:
+        await refresh_department_directory(force=True)
+    except Exception as e:
+        # без справочника названия кафедр берутся из кэша и MongoDB
+        logger.error("Department directory load failed: %s", e)
+    app.state.departments_task = asyncio.create_task(department_directory_watcher())
+    if snapshot_enabled():
+        # до первой загрузки снимка запросы идут в Neo4j
+        app.state.snapshot_task = asyncio.create_task(snapshot_refresher())
+    if materials_index_enabled():
+        # до первой сборки индекса запросы идут в ES
+        app.state.materials_index_task = asyncio.create_task(materials_index_refresher())
+    if vocab_filter_enabled():
+        app.state.vocab_filter_task = asyncio.create_task(vocab_filter_refresher())
+    if settings.warmup_on_startup:
+        # прогрев идёт в фоне сразу после готовности сервиса
+        app.state.warmup_task = asyncio.create_task(run_warmup())
+
+    yield
+    for task in (app.state.warmup_task, app.state.snapshot_task, app.state.materials_index_task,
+                 app.state.vocab_filter_task, app.state.departments_task):
+        if task is not None:
+            task.cancel()
+    await close_connections(app)
+
 class StudentReport(BaseModel):
     student_id: int
     code: str
@@ -112,23 +264,272 @@ class ReportResponse(BaseModel):
 
 app = FastAPI(title="Lab1 Service", lifespan=lifespan)
 
-async def fetch_lecture_ids(es, pool, term: str, start: str, end: str) -> set[int] | None:
-    """Поиск лекций по термину в ES и фильтрация по датам в PostgreSQL"""
+
+# ───── пакетная загрузка справочников в пределах запроса ─────────────────────
+# DataLoader общий для сервисов: common/dataloader.py
+app.middleware("http")(dataloader_scope)
+
+
+def loader(entity: str) -> DataLoader:
+    return request_loader(LOADERS, entity)
+
+
+# ───── встроенный инвертированный индекс материалов ──────────────────────────
+# Повторяет анализатор ru_text индекса materials (standard → lowercase →
+# russian_stop → russian_stemmer): термин → отсортированный массив class_id.
+RUSSIAN_STOPWORDS = frozenset("""
+    а без более бы был была были было быть в вам вас весь во вот все всего всех вы
+    где да даже для до его ее если есть еще же за здесь и из или им их к как ко
+    когда кто ли либо мне может мы на надо наш не него нее нет ни них но ну о об
+    однако он она они оно от очень по под при с со так также такой там те тем то
+    того тоже той только том ты у уже хотя чего чей чем что чтобы чье чья эта эти
+    это я
+""".split())
+TOKEN_RE = re.compile(r"\w+")
+MATERIALS_INDEX_BATCH = 5000
+
+
+def analyze_text(text: str, stemmer, stems: dict) -> list[str]:
+    """Термы текста так, как их индексирует ES; stems — кэш стемов по словам."""
+    terms = []
+    for word in TOKEN_RE.findall(text.lower()):
+        if word in RUSSIAN_STOPWORDS:
+            continue
+        stem = stems.get(word)
+        if stem is None:
+            stem = stems[word] = stemmer.stemWord(word)
+        terms.append(stem)
+    return terms
+
+
+@lru_cache(maxsize=1)
+def _query_stemmer():
+    # стеммер Snowball хранит состояние в объекте: у запросов свой, не общий с потоком сборки
+    return snowballstemmer.stemmer("russian")
+
+
+@lru_cache(maxsize=10000)
+def analyze_query(term: str) -> tuple[str, ...]:
+    return tuple(dict.fromkeys(analyze_text(term, _query_stemmer(), {})))
+
+
+class MaterialsIndex:
+    """
+    Постинги — array('i') с отсортированными class_id. Новые материалы
+    подхватываются по водяному знаку material_id; удаление материалов
+    (число строк меньше ожидаемого) приводит к полной пересборке.
+    """
+
+    def __init__(self):
+        self.postings: dict[str, array] = {}
+        self.watermark = 0
+        self.materials = 0
+        self.loaded_at: datetime | None = None
+        self._stemmer = snowballstemmer.stemmer("russian")
+        self._stems: dict[str, str] = {}
+
+    def add(self, rows) -> None:
+        """Добавляет строки (material_id, class_id, content)."""
+        batch: dict[str, set[int]] = {}
+        for material_id, class_id, content in rows:
+            self.watermark = max(self.watermark, material_id)
+            self.materials += 1
+            if class_id is None or not content:
+                continue
+            for term in set(analyze_text(content, self._stemmer, self._stems)):
+                batch.setdefault(term, set()).add(class_id)
+        for term, class_ids in batch.items():
+            current = self.postings.get(term)
+            if current is not None:
+                class_ids.update(current)
+            self.postings[term] = array("i", sorted(class_ids))
+        self.loaded_at = datetime.now()
+
+    def lookup(self, query: str, max_terms: int) -> list[int] | None:
+        """
+        class_id материалов, содержащих любой из терминов запроса (как match в ES).
+        None — запрос из слишком многих терминов: его ранжирует ES.
+        """
+        terms = analyze_query(query)
+        if len(terms) > max_terms:
+            return None
+        class_ids: set[int] = set()
+        for term in terms:
+            class_ids.update(self.postings.get(term, ()))
+        return sorted(class_ids)
+
+
+def materials_index_enabled() -> bool:
+    return settings.materials_index_enabled and snowballstemmer is not None
+
+
+async def _load_materials(index: MaterialsIndex, pool) -> None:
+    async with pool.acquire() as conn:
+        async with conn.transaction(readonly=True):
+            cursor = conn.cursor(
+                "SELECT material_id, class_id, content FROM materials "
+                "WHERE material_id > $1 ORDER BY material_id",
+                index.watermark, prefetch=MATERIALS_INDEX_BATCH,
+            )
+            batch = []
+            async for r in cursor:
+                batch.append((r["material_id"], r["class_id"], r["content"]))
+                if len(batch) >= MATERIALS_INDEX_BATCH:
+                    # разбор текста — в отдельном потоке, чтобы не блокировать цикл событий
+                    await asyncio.to_thread(index.add, batch)
+                    batch = []
+            await asyncio.to_thread(index.add, batch)
+
+
+async def refresh_materials_index() -> int:
+    """Дочитывает материалы после водяного знака; возвращает число новых строк."""
+    pool = app.state.db
+    index = getattr(app.state, "materials_index", None)
+    if index is not None:
+        row = await pool.fetchrow(
+            "SELECT count(*) AS total, count(*) FILTER (WHERE material_id <= $1) AS known FROM materials",
+            index.watermark,
+        )
+        if row["known"] == index.materials:
+            if row["total"] == row["known"]:
+                return 0
+            before = index.materials
+            await _load_materials(index, pool)
+            return index.materials - before
+
+    started = time.perf_counter()
+    index = MaterialsIndex()
+    await _load_materials(index, pool)
+    app.state.materials_index = index
+    logger.info("Materials index built in %.2fs: %d materials, %d terms",
+                time.perf_counter() - started, index.materials, len(index.postings))
+    return index.materials
+
+
+async def materials_index_refresher():
+    while True:
+        try:
+            await refresh_materials_index()
+        except Exception as e:
+            # пока индекс не обновлён, отвечает прежний индекс или ES
+            logger.error("Materials index refresh failed: %s", e)
+        await asyncio.sleep(settings.materials_index_refresh_seconds)
+
+
+def lookup_materials_index(term: str) -> list[int] | None:
+    """class_id по встроенному индексу или None, если запрос должен уйти в ES."""
+    index = getattr(app.state, "materials_index", None)
+    if not materials_index_enabled() or index is None:
+        return None
+    return index.lookup(term, settings.materials_index_max_terms)
+
+
+# ───── фильтр словаря материалов ─────────────────────────────────────────────
+# Bloom-фильтр по термам materials.content собирает и дописывает main.py
+# (Redis-хэш vocab:filter); сервис держит копию в памяти и сверяет version.
+VOCAB_FILTER_KEY = "vocab:filter"
+
+
+class BloomFilter:
+    """Битовый массив m бит, k позиций на терм по двойному хэшированию blake2b."""
+
+    def __init__(self, m: int, k: int, bits: bytes, version: str):
+        self.m, self.k, self.bits, self.version = m, k, bits, version
+
+    @classmethod
+    def from_mapping(cls, data: dict) -> "BloomFilter":
+        return cls(int(data["m"]), int(data["k"]), base64.b64decode(data["bits"]), data["version"])
+
+    def __contains__(self, term: str) -> bool:
+        digest = hashlib.blake2b(term.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.k):
+            pos = (h1 + i * h2) % self.m
+            if not self.bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+
+def vocab_filter_enabled() -> bool:
+    return settings.vocab_filter_enabled and snowballstemmer is not None
+
+
+async def refresh_vocab_filter() -> bool:
+    """Перечитывает фильтр, если main.py опубликовал новую версию; без ключа фильтр снимается."""
+    redis = app.state.redis
+    version = await redis.hget(VOCAB_FILTER_KEY, "version")
+    current = getattr(app.state, "vocab_filter", None)
+    if version is None:
+        app.state.vocab_filter = None
+        return current is not None
+    if current is not None and current.version == version:
+        return False
+    data = await redis.hgetall(VOCAB_FILTER_KEY)
+    if not data:
+        app.state.vocab_filter = None
+        return current is not None
+    app.state.vocab_filter = await asyncio.to_thread(BloomFilter.from_mapping, data)
+    logger.info("Vocabulary filter loaded: %s terms, %d bytes", data["terms"], len(app.state.vocab_filter.bits))
+    return True
+
+
+async def vocab_filter_refresher():
+    while True:
+        try:
+            await refresh_vocab_filter()
+        except Exception as e:
+            # пока фильтр не обновлён, действует прежний; без фильтра запросы идут в ES
+            logger.error("Vocabulary filter refresh failed: %s", e)
+        await asyncio.sleep(settings.vocab_filter_refresh_seconds)
+
+
+def vocab_filter_rejects(term: str) -> bool:
+    """True, если ни одного терма запроса заведомо нет в материалах (match в ES ничего не найдёт)."""
+    bloom = getattr(app.state, "vocab_filter", None)
+    if not vocab_filter_enabled() or bloom is None:
+        return False
+    terms = analyze_query(term)
+    # запрос из одних стоп-слов фильтром не отсекается: решение остаётся за ES
+    return bool(terms) and not any(t in bloom for t in terms)
+
+
+async def search_class_ids(es, term: str) -> list[int]:
+    """Полнотекстовый поиск class_id в ES с кэшированием результата"""
     # Проверяем кэш для результатов поиска ES
     es_cache_key = generate_cache_key("es_search", term)
     cached_ids = await get_cached_data(app.state.redis, es_cache_key)
+    if cached_ids is not None:
+        return cached_ids
+
+    # class_id читается из doc values, без разбора _source
+    query = {
+        "query": {"match": {"content": term}},
+        "_source": False,
+        "docvalue_fields": ["class_id"],
+    }
+    resp = await es.search(index="materials", body=query, size=1000)
+    class_ids = [int(hit["fields"]["class_id"][0]) for hit in resp["hits"]["hits"]]
+    # пустой результат тоже кэшируем, но коротко
+    await set_cached_data(
+        app.state.redis, es_cache_key, class_ids,
+        ttl=CACHE_TTL if class_ids else NEGATIVE_CACHE_TTL,
+        tags=[f"term:{term}", "materials"]
+    )
+    return class_ids
+
+
+async def fetch_lecture_ids(es, pool, term: str, start: str, end: str) -> set[int] | None:
+    """Поиск лекций по термину (встроенный индекс или ES) и фильтрация по датам в PostgreSQL"""
+    # 1) короткие запросы — во встроенном индексе, без сетевых обращений
+    class_ids = lookup_materials_index(term)
+    if class_ids is None and vocab_filter_rejects(term):
+        # ни одного терма запроса нет в словаре материалов — ES не нужен
+        class_ids = []
+    if class_ids is None:
+        class_ids = await search_class_ids(es, term)
+    if not class_ids:
+        return None
 
-    if cached_ids is None:
-        # 1) полнотекстовый поиск в ES если нет в кэше
-        query = {"query": {"match": {"content": term}}}
-        resp = await es.search(index="materials", body=query, size=1000)
-        class_ids = [int(hit["_source"]["class_id"]) for hit in resp["hits"]["hits"]]
-        if not class_ids:
-            return None
-        await set_cached_data(app.state.redis, es_cache_key, class_ids)
-    else:
-        class_ids = cached_ids
-        
     # 2) фильтрация по дате в Postgres
     sch = Table('shedule')
     q = (
@@ -164,69 +565,441 @@ async def fetch_attendance(
     return {r["student_id"]: (r["attended_cnt"], r["total_cnt"]) for r in rows}
 
 
-async def fetch_student_details(pool, mongo, student_ids: list[int]) -> dict[int, dict]:
-    """Получение информации о студентах из базы данных"""
-    s = Table('students')
-    g = Table('groups')
-    sp = Table('specialties')
+# ───── битовые индексы посещаемости ──────────────────────────────────────────
+# Индексы строит и обновляет main.py (bitmap:attended:<shedule_id>,
+# bitmap:group:<group_id>, значение "<base>:<hex>"); сервис только читает.
+BITMAP_ATTENDED_PREFIX = "bitmap:attended"
+BITMAP_GROUP_PREFIX    = "bitmap:group"
+BITMAP_READY_KEY       = "bitmap:ready"
+SCHEDULE_GROUPS_SQL = """
+    SELECT sh.shedule_id, g.group_id
+    FROM shedule     sh
+    JOIN classes     cl ON cl.class_id = sh.class_id
+    JOIN courses     c  ON c.course_id = cl.course_id
+    JOIN specialties sp ON sp.spec_id  = c.spec_id
+    JOIN groups      g  ON g.spec_id   = sp.spec_id
+    WHERE sh.shedule_id = ANY($1::int[])
+"""
 
-    q = (
-        PypikaQuery
-        .from_(s)
-        .join(g).on(s.group_id == g.group_id)
-        .join(sp).on(g.spec_id == sp.spec_id)
-        .select(
-            s.student_id,
-            s.code,
-            s.full_name,
-            g.name.as_('group_name'),
-            sp.name.as_('specialty'),
-            sp.dept_id.as_('dept_id')    
-        )
-        .where(s.student_id.isin(student_ids))
+
+def decode_bitset(value) -> int:
+    if not value:
+        return 0
+    base, bits = value.split(":")
+    return int(bits, 16) << int(base)
+
+
+def bit_positions(bits: int):
+    """Номера установленных битов по возрастанию."""
+    digits = bin(bits)[:1:-1]
+    i = digits.find("1")
+    while i != -1:
+        yield i
+        i = digits.find("1", i + 1)
+
+
+class BitCounter:
+    """
+    Поразрядный (bit-sliced) счётчик: i-й битсет хранит i-й разряд счётчика
+    каждого студента. Добавление битсета — сложение с переносом через AND/XOR.
+    """
+
+    def __init__(self):
+        self.planes: list[int] = []
+
+    def add(self, bits: int) -> None:
+        for i, plane in enumerate(self.planes):
+            if not bits:
+                return
+            self.planes[i], bits = plane ^ bits, plane & bits
+        if bits:
+            self.planes.append(bits)
+
+    def counts(self, positions) -> dict[int, int]:
+        digits = [bin(plane)[:1:-1] for plane in self.planes]
+        return {
+            pos: sum(1 << i for i, d in enumerate(digits) if pos < len(d) and d[pos] == "1")
+            for pos in positions
+        }
+
+
+async def fetch_attendance_bitmaps(pool, redis, lecture_ids: set[int]) -> dict[int, tuple[int, int]] | None:
+    """
+    То же, что fetch_attendance, по битовым индексам: план студента — OR битсетов
+    групп-владельцев расписания, посещения — AND с планом; счётчики — поразрядно.
+    None, если индексы ещё не собраны.
+    """
+    if not await redis.exists(BITMAP_READY_KEY):
+        return None
+    owners: dict[int, list[int]] = {}
+    for r in await pool.fetch(SCHEDULE_GROUPS_SQL, list(lecture_ids)):
+        owners.setdefault(r["shedule_id"], []).append(r["group_id"])
+    if not owners:
+        return {}
+
+    group_ids = sorted({gid for gids in owners.values() for gid in gids})
+    schedule_ids = list(owners)
+    raw = await redis.mget(
+        [f"{BITMAP_GROUP_PREFIX}:{gid}" for gid in group_ids]
+        + [f"{BITMAP_ATTENDED_PREFIX}:{sch}" for sch in schedule_ids]
+    )
+    groups = dict(zip(group_ids, map(decode_bitset, raw[:len(group_ids)])))
+    attended = dict(zip(schedule_ids, map(decode_bitset, raw[len(group_ids):])))
+
+    planned_counter, attended_counter, everyone = BitCounter(), BitCounter(), 0
+    for sch, gids in owners.items():
+        planned = 0
+        for gid in gids:
+            planned |= groups[gid]
+        planned_counter.add(planned)
+        attended_counter.add(attended[sch] & planned)
+        everyone |= planned
+
+    students = list(bit_positions(everyone))
+    planned_counts = planned_counter.counts(students)
+    attended_counts = attended_counter.counts(students)
+    return {sid: (attended_counts[sid], planned_counts[sid]) for sid in students}
+
+
+# ───── недельные агрегаты посещаемости ───────────────────────────────────────
+# attendance_rollup ведёт main.py (init/postgres/rollup-attendance.sql).
+# Из агрегата берутся только недели [week, week + 7), лежащие внутри [start, end);
+# остальные, включая неделю, которая заканчивается в день end, считаются по сырым
+# расписаниям lecture_ids — с тем же отбором по датам, что и у других движков.
+ROLLUP_ATTENDANCE_SQL = """
+    WITH lectures AS (
+        SELECT shedule_id, class_id, date_trunc('week', start_time)::date AS week
+        FROM shedule
+        WHERE shedule_id = ANY($1::int[])
+    ),
+    weekly AS (
+        SELECT r.student_id, r.planned, r.attended
+        FROM attendance_rollup r
+        WHERE r.class_id IN (SELECT class_id FROM lectures)
+          AND r.week >= $2 AND r.week + 7 <= $3
+    ),
+    edges AS (
+        SELECT s.student_id, 1 AS planned, (a.presence IS TRUE)::int AS attended
+        FROM lectures    l
+        JOIN classes     cl ON cl.class_id = l.class_id
+        JOIN courses     c  ON c.course_id = cl.course_id
+        JOIN groups      g  ON g.spec_id   = c.spec_id
+        JOIN students    s  ON s.group_id  = g.group_id
+        LEFT JOIN attendances a ON a.student_id = s.student_id AND a.shedule_id = l.shedule_id
+        WHERE NOT (l.week >= $2 AND l.week + 7 <= $3)
     )
-    sql = q.get_sql()
-    rows = await pool.fetch(sql)
-    details = {}
-    dept_ids = set()
-    for r in rows:
-        sid = r['student_id']
-        did = r['dept_id']
-        details[sid] = {
-            "code":       r["code"],
-            "full_name":  r["full_name"],
-            "group":      r["group_name"],
-            "specialty":  r["specialty"],
-            "dept_id":    did  
+    SELECT student_id, sum(attended) AS attended_cnt, sum(planned) AS total_cnt
+    FROM (SELECT * FROM weekly UNION ALL SELECT * FROM edges) AS t
+    GROUP BY student_id
+"""
+
+
+async def fetch_attendance_rollup(
+    pool, lecture_ids: set[int], start: date, end: date
+) -> dict[int, tuple[int, int]] | None:
+    """
+    То же, что fetch_attendance, по недельным агрегатам. lecture_ids — все
+    расписания найденных занятий в окне [start, end] (как в fetch_lecture_ids).
+    None, если таблицы агрегатов ещё нет.
+    """
+    try:
+        rows = await pool.fetch(ROLLUP_ATTENDANCE_SQL, list(lecture_ids), start, end)
+    except asyncpg.exceptions.UndefinedTableError:
+        logger.warning("attendance_rollup is missing, falling back to Neo4j")
+        return None
+    return {r["student_id"]: (r["attended_cnt"], r["total_cnt"]) for r in rows}
+
+
+# ───── колоночный снимок посещаемости ────────────────────────────────────────
+def snapshot_enabled() -> bool:
+    return settings.attendance_engine == "snapshot" and np is not None
+
+
+async def refresh_snapshot(force: bool = False) -> bool:
+    """Перестраивает снимок, если в журнале graph_outbox появились изменения."""
+    current = getattr(app.state, "snapshot", None)
+    if not force and current is not None:
+        if await snapshot_version(app.state.db) == current.version:
+            return False
+    started = time.perf_counter()
+    app.state.snapshot = await AttendanceSnapshot.load(app.state.db)
+    logger.info("Attendance snapshot loaded in %.2fs: %d students, %d schedules",
+                time.perf_counter() - started, len(app.state.snapshot.student_ids),
+                len(app.state.snapshot.schedule_ids))
+    return True
+
+
+async def snapshot_refresher():
+    while True:
+        try:
+            await refresh_snapshot()
+        except Exception as e:
+            # пока снимок не обновлён, отвечает прежний снимок или Neo4j
+            logger.error("Attendance snapshot refresh failed: %s", e)
+        await asyncio.sleep(settings.snapshot_refresh_seconds)
+
+
+async def attendance_for_lectures(
+    lecture_ids: set[int], period: tuple[date, date] | None = None
+) -> dict[int, tuple[int, int]]:
+    """
+    Посещаемость из выбранного движка; пока он не готов — из Neo4j.
+    Агрегатам нужен period — окно дат, по которому отобраны lecture_ids.
+    """
+    snapshot = getattr(app.state, "snapshot", None)
+    if snapshot_enabled() and snapshot is not None:
+        return snapshot.attendance(lecture_ids)
+    if settings.attendance_engine == "bitmap":
+        attendance = await fetch_attendance_bitmaps(app.state.db, app.state.redis, lecture_ids)
+        if attendance is not None:
+            return attendance
+    if settings.attendance_engine == "rollup" and period is not None:
+        attendance = await fetch_attendance_rollup(app.state.db, lecture_ids, *period)
+        if attendance is not None:
+            return attendance
+    return await fetch_attendance(app.state.neo4j, lecture_ids)
+
+
+async def benchmark_attendance_engines(rounds: int = 20) -> dict:
+    """
+    Сравнение времени ответа fetch_attendance: Neo4j, снимок в памяти, битовые
+    индексы и агрегаты. Снимок — только при наличии NumPy.
+    """
+    ids = [r["shedule_id"] for r in await app.state.db.fetch(
+        "SELECT shedule_id FROM shedule WHERE start_time IS NOT NULL ORDER BY shedule_id"
+    )]
+    sample = ids[: max(1, len(ids) // 10)]
+    # все расписания выбранных занятий — так же, как их отбирает fetch_lecture_ids
+    rows = await app.state.db.fetch("""
+        SELECT shedule_id, start_time FROM shedule
+        WHERE start_time IS NOT NULL
+          AND class_id IN (SELECT class_id FROM shedule WHERE shedule_id = ANY($1::int[]))
+    """, sample)
+    lecture_ids = {r["shedule_id"] for r in rows}
+    period = (min(r["start_time"] for r in rows), max(r["start_time"] for r in rows))
+
+    engines = [
+        ("neo4j", lambda: fetch_attendance(app.state.neo4j, lecture_ids)),
+        ("bitmap", lambda: fetch_attendance_bitmaps(app.state.db, app.state.redis, lecture_ids)),
+        ("rollup", lambda: fetch_attendance_rollup(app.state.db, lecture_ids, *period)),
+    ]
+    if np is not None:
+        await refresh_snapshot(force=True)
+        snapshot = app.state.snapshot
+        engines.insert(1, ("snapshot", lambda: asyncio.to_thread(snapshot.attendance, lecture_ids)))
+
+    timings = {}
+    for name, fetch in engines:
+        samples = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            result = await fetch()
+            samples.append((time.perf_counter() - started) * 1000)
+        samples.sort()
+        timings[name] = {
+            "students": len(result or {}),
+            "p50_ms": round(samples[len(samples) // 2], 2),
+            "p95_ms": round(samples[int(len(samples) * 0.95) - 1], 2),
         }
-        dept_ids.add(did)
+    return {"lectures": len(lecture_ids), **timings}
+
+
+async def mget_entities(redis, prefix: str, ids, required=()) -> tuple[dict[int, dict], list[int]]:
+    """
+    Пакетное чтение сущностей <prefix>:<id> одним MGET.
+    Возвращает найденные записи и id, которых нет в кэше (или запись неполная).
+    """
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return {}, []
+    raw = await redis.mget([f"{prefix}:{i}" for i in ids])
+    found, missing = {}, []
+    for i, value in zip(ids, raw):
+        entity = json.loads(value) if value else None
+        if entity is None or any(field not in entity for field in required):
+            missing.append(i)
+        else:
+            found[i] = entity
+    logger.info(f"Entity cache {prefix}: {len(found)} hits, {len(missing)} misses")
+    return found, missing
+
+async def mset_entities(redis, prefix: str, entities: dict[int, dict], ttl: int = ENTITY_CACHE_TTL):
+    """Запись сущностей <prefix>:<id> одним конвейером"""
+    if not entities:
+        return
+    async with redis.pipeline(transaction=False) as pipe:
+        for i, entity in entities.items():
+            pipe.set(f"{prefix}:{i}", json.dumps(entity, cls=CustomJSONEncoder), ex=ttl)
+        await pipe.execute()
 
+
+# ───── справочник кафедр ─────────────────────────────────────────────────────
+# departments — плоская копия кафедр из universities (её ведёт main.py)
+DEPARTMENT_PROJECTION = {"_id": 0, "department_id": 1, "name": 1}
+# БД, созданные до появления departments, читаются из universities,
+# пока копию не соберёт `python main.py sync-departments` или seed
+UNIVERSITY_DEPARTMENTS_PIPELINE = [
+    {"$unwind": "$institutes"},
+    {"$unwind": "$institutes.departments"},
+    {"$project": {
+        "_id": 0,
+        "department_id": "$institutes.departments.department_id",
+        "name": "$institutes.departments.name",
+    }},
+]
+
+
+async def find_departments(mongo, dept_ids=None) -> list[dict]:
+    """Кафедры {department_id, name}: все или перечисленные"""
+    query = {} if dept_ids is None else {"department_id": {"$in": list(dept_ids)}}
+    docs = await mongo.departments.find(query, DEPARTMENT_PROJECTION).to_list(length=None)
+    if docs or await mongo.departments.estimated_document_count():
+        return docs
+    logger.warning("departments collection is empty, reading departments from universities")
+    pipeline = list(UNIVERSITY_DEPARTMENTS_PIPELINE)
+    if dept_ids is not None:
+        pipeline.append({"$match": query})
+    return await mongo.universities.aggregate(pipeline).to_list(length=None)
+
+
+async def refresh_department_directory(force: bool = False) -> bool:
+    """
+    Перечитывает справочник dept_id → название, если изменилась версия
+    meta.departments (её увеличивают main.py и init-mongodb.js).
+    """
+    mongo = app.state.mongo
+    meta = await mongo.meta.find_one({"_id": "departments"}, {"version": 1})
+    version = meta["version"] if meta else 0
+    if not force and app.state.departments is not None and version == app.state.departments_version:
+        return False
+    # версия читается до справочника: правка между ними догонится следующей проверкой
+    docs = await find_departments(mongo)
+    app.state.departments = {doc["department_id"]: doc["name"] for doc in docs}
+    app.state.departments_version = version
+    logger.info("Department directory loaded: %d departments, version %s",
+                len(app.state.departments), version)
+    return True
+
+
+async def department_directory_watcher():
+    """Change stream по departments, а на одиночном mongod — опрос версии."""
+    try:
+        async with app.state.mongo.departments.watch() as stream:
+            async for _ in stream:
+                await refresh_department_directory(force=True)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.info("Change stream unavailable (%s), polling department version", e)
+    while True:
+        try:
+            await refresh_department_directory()
+        except Exception as e:
+            logger.error("Department directory refresh failed: %s", e)
+        await asyncio.sleep(settings.department_refresh_seconds)
+
+
+async def fetch_department_names(mongo, dept_ids) -> dict[int, str]:
+    """
+    Названия кафедр из справочника в памяти; отсутствующие в нём (справочник
+    ещё не догнал правку) — из кэша dept:<id>, затем одним find по индексу в MongoDB
+    """
+    directory = getattr(app.state, "departments", None) or {}
+    dept_map = {did: directory[did] for did in dept_ids if did in directory}
+    dept_ids = [did for did in dept_ids if did not in directory]
     if not dept_ids:
-        return {sid: {**v, "department": ""} for sid, v in details.items()}
-
-    # 2) Из MongoDB получаем названия кафедр по dept_id
-    pipeline = [
-        { "$unwind": "$institutes" },
-        { "$unwind": "$institutes.departments" },
-        { "$match": { "institutes.departments.department_id": { "$in": list(dept_ids) } } },
-        { "$project": {
-            "_id": 0,
-            "department_id": "$institutes.departments.department_id",
-            "department_name": "$institutes.departments.name"
-        } }
-    ]
-    cursor = mongo.universities.aggregate(pipeline)
-    docs = await cursor.to_list(length=None)
+        return dept_map
 
-    dept_map = { doc["department_id"]: doc["department_name"] for doc in docs }
+    redis = app.state.redis
+    cached, missing = await mget_entities(redis, "dept", dept_ids, required=("name",))
+    dept_map.update({did: entity["name"] for did, entity in cached.items()})
+    if not missing:
+        return dept_map
 
-    # 3) Вкладываем department_name в детали и убираем dept_id
-    for sid, info in details.items():
-        info["department"] = dept_map.get(info["dept_id"], "")
-        del info["dept_id"]
+    # плоская коллекция departments: поиск по уникальному индексу department_id
+    docs = await find_departments(mongo, missing)
 
+    loaded = {
+        doc["department_id"]: {"department_id": doc["department_id"], "name": doc["name"]}
+        for doc in docs
+    }
+    await mset_entities(redis, "dept", loaded)
+    dept_map.update({did: entity["name"] for did, entity in loaded.items()})
+    return dept_map
+
+
+# `= ANY($1)`: один параметр-массив вместо IN со списком литералов в тексте запроса
+AnyOf = CustomFunction("ANY", ["values"])
+
+
+async def load_student_entities(student_ids: list[int]) -> dict[int, dict]:
+    """Записи студентов: кэш student:<id>, недостающие — одним запросом к PostgreSQL"""
+    pool, redis = app.state.db, app.state.redis
+    details, missing = await mget_entities(redis, "student", student_ids, required=STUDENT_ENTITY_FIELDS)
+
+    if missing:
+        s = Table('students')
+        g = Table('groups')
+        sp = Table('specialties')
+
+        q = (
+            PypikaQuery
+            .from_(s)
+            .join(g).on(s.group_id == g.group_id)
+            .join(sp).on(g.spec_id == sp.spec_id)
+            .select(
+                s.student_id,
+                s.code,
+                s.full_name,
+                g.name.as_('group_name'),
+                sp.name.as_('specialty'),
+                sp.dept_id.as_('dept_id')    
+            )
+            .where(s.student_id == AnyOf(Parameter("$1")))
+        )
+        sql = q.get_sql()
+        rows = await pool.fetch(sql, missing)
+        loaded = {}
+        for r in rows:
+            loaded[r['student_id']] = {
+                "student_id": r["student_id"],
+                "code":       r["code"],
+                "full_name":  r["full_name"],
+                "group":      r["group_name"],
+                "specialty":  r["specialty"],
+                "dept_id":    r["dept_id"]
+            }
+        await mset_entities(redis, "student", loaded)
+        details.update(loaded)
     return details
 
+
+LOADERS = {
+    "students":    load_student_entities,
+    "departments": lambda dept_ids: fetch_department_names(app.state.mongo, dept_ids),
+}
+
+
+async def fetch_student_details(student_ids: list[int]) -> dict[int, dict]:
+    """Информация о студентах через загрузчики запроса: студенты и кафедры — по пакету на сущность"""
+    details = await loader("students").load_many(student_ids)
+
+    dept_ids = {info["dept_id"] for info in details.values() if info["dept_id"] is not None}
+    # 2) Названия кафедр по dept_id
+    dept_map = await loader("departments").load_many(dept_ids) if dept_ids else {}
+
+    # 3) Вкладываем department_name в детали и убираем dept_id
+    return {
+        sid: {
+            "code":       info["code"],
+            "full_name":  info["full_name"],
+            "group":      info["group"],
+            "specialty":  info["specialty"],
+            "department": dept_map.get(info["dept_id"], "")
+        }
+        for sid, info in details.items()
+    }
+
 @app.get("/report", response_model=ReportResponse)
 async def generate_report(
     term: str = Query("введение", description="Search term for lectures"),
@@ -234,12 +1007,25 @@ async def generate_report(
     end: str = Query("2023-10-16", description="End date YYYY-MM-DD")
 ):
     """Генерация отчета о посещаемости лекций с заданными параметрами"""
+    start_date, end_date = parse_period_date(start), parse_period_date(end)
+    if start_date is None or end_date is None:
+        raise HTTPException(status_code=422, detail="Dates must be in YYYY-MM-DD format")
+    await record_request_popularity(app.state.redis, "report", {
+        "term": normalize_term(term), "start": start_date.isoformat(), "end": end_date.isoformat()
+    })
+    return await build_report(term, start_date, end_date)
+
+
+async def build_report(term: str, start_date: date, end_date: date) -> ReportResponse:
+    """Построение отчёта с кэшированием — общий путь для запросов и прогрева"""
+    term, start, end = normalize_term(term), start_date.isoformat(), end_date.isoformat()
     logger.info("Generating report for term='%s', period=%s to %s", term, start, end)
     
     # Проверяем кэш
     cache_key = generate_cache_key("report", term, start, end)
     cached_data = await get_cached_data(app.state.redis, cache_key)
     if cached_data:
+        raise_if_negative(cached_data)
         logger.info("Returning cached report data")
         return ReportResponse(**cached_data)
 
@@ -247,11 +1033,13 @@ async def generate_report(
     lecture_ids = await fetch_lecture_ids(app.state.es, app.state.db, term, start, end)
     if not lecture_ids:
         logger.warning("No lectures found for term '%s' and period %s-%s", term, start, end)
-        raise HTTPException(status_code=404, detail="No lectures found for given term and period")
+        detail = "No lectures found for given term and period"
+        await set_negative_cache(app.state.redis, cache_key, detail, tags=[f"term:{term}", "materials"])
+        raise HTTPException(status_code=404, detail=detail)
     logger.info(" Found lecture_ids: %s", lecture_ids)
 
     # 2. Получение данных о посещаемости
-    attendance = await fetch_attendance(app.state.neo4j, lecture_ids)
+    attendance = await attendance_for_lectures(lecture_ids, (start_date, end_date))
     logger.info(" Found attendance: %s", attendance)
 
     # 3. Расчёт процента посещаемости
@@ -268,7 +1056,7 @@ async def generate_report(
     logger.info(" Top 10 student_ids: %s", student_ids)
 
     # 5. Детали студентов
-    details = await fetch_student_details(app.state.db, app.state.mongo, student_ids)
+    details = await fetch_student_details(student_ids)
 
     # 6. Формирование отчёта
     report_students = []
@@ -295,15 +1083,158 @@ async def generate_report(
     )
     
     # Сохраняем результат в кэш
-    await set_cached_data(app.state.redis, cache_key, response.model_dump())
+    tags = [f"term:{term}", "materials", *(f"schedule:{sid}" for sid in lecture_ids)]
+    ttl = period_cache_ttl(start_date, end_date)
+    await set_cached_data(app.state.redis, cache_key, response.model_dump(), ttl=ttl, tags=tags)
     
     logger.info("Report generated and cached: %d students, %d lectures", len(report_students), len(lecture_ids))
     return response
 
-if __name__ == "__main__":
-    uvicorn.run(
-        "app_1.main_1:app",
-        host="127.0.0.1",
-        port=8001,
-        workers=1
+
+# ───── прогрев кэша ──────────────────────────────────────────────────────────
+POPULARITY_DAYS = 7
+
+
+class WarmupProgress(BaseModel):
+    state: str = "idle"            # idle | running | done | failed
+    total: int = 0
+    done: int = 0
+    failed: int = 0
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+
+async def record_request_popularity(redis, prefix: str, params: dict):
+    """Учёт обращений к отчёту в дневном рейтинге popular:<prefix>:<дата>"""
+    key = f"popular:{prefix}:{date.today().isoformat()}"
+    member = json.dumps(params, sort_keys=True, ensure_ascii=False)
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.zincrby(key, 1, member)
+        pipe.expire(key, POPULARITY_DAYS * 24 * 60 * 60)
+        await pipe.execute()
+
+
+async def popular_requests(redis, prefix: str, limit: int) -> list[dict]:
+    """Самые частые параметры запросов за последние POPULARITY_DAYS дней"""
+    today = date.today()
+    async with redis.pipeline(transaction=False) as pipe:
+        for days_ago in range(POPULARITY_DAYS):
+            key = f"popular:{prefix}:{(today - timedelta(days=days_ago)).isoformat()}"
+            pipe.zrevrange(key, 0, limit - 1, withscores=True)
+        daily = await pipe.execute()
+
+    scores = Counter()
+    for ranking in daily:
+        for member, score in ranking:
+            scores[member] += score
+    return [json.loads(member) for member, _ in scores.most_common(limit)]
+
+
+async def warmup_requests() -> list[dict]:
+    """Настроенные отчёты и популярные по статистике Redis, без дублей"""
+    requests = [*settings.warmup_reports]
+    requests += await popular_requests(app.state.redis, "report", settings.warmup_popular_limit)
+    unique = {}
+    for params in requests:
+        key = generate_cache_key("report", params.get("term"), params.get("start"), params.get("end"))
+        unique.setdefault(key, params)
+    return list(unique.values())
+
+
+async def warm_cache(requests: list[dict], concurrency: int) -> WarmupProgress:
+    """Предрасчёт отчётов с ограничением числа одновременных запросов"""
+    progress = app.state.warmup = WarmupProgress(
+        state="running", total=len(requests), started_at=datetime.utcnow()
     )
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def warm_one(params: dict):
+        async with semaphore:
+            try:
+                start_date = parse_period_date(params["start"])
+                end_date = parse_period_date(params["end"])
+                if start_date is None or end_date is None:
+                    raise ValueError(f"invalid period in {params}")
+                await build_report(params["term"], start_date, end_date)
+            except HTTPException as e:
+                # 404 тоже попадает в кэш (отрицательный ответ) — это успешный прогрев
+                if e.status_code != 404:
+                    progress.failed += 1
+            except Exception as e:
+                logger.warning("Warmup failed for %s: %s", params, e)
+                progress.failed += 1
+            progress.done += 1
+            logger.info("Warmup progress: %d/%d (failed: %d)", progress.done, progress.total, progress.failed)
+
+    await asyncio.gather(*(warm_one(params) for params in requests))
+    progress.state = "done"
+    progress.finished_at = datetime.utcnow()
+    return progress
+
+
+async def run_warmup() -> WarmupProgress:
+    try:
+        requests = await warmup_requests()
+        logger.info("Cache warmup: %d reports", len(requests))
+        return await warm_cache(requests, settings.warmup_concurrency)
+    except Exception:
+        logger.exception("Cache warmup aborted")
+        app.state.warmup.state = "failed"
+        return app.state.warmup
+    finally:
+        # ни сбой, ни отмена задачи не оставляют прогрев в состоянии running
+        progress = app.state.warmup
+        if progress.state == "running":
+            progress.state = "failed"
+        if progress.finished_at is None:
+            progress.finished_at = datetime.utcnow()
+
+
+@app.post("/admin/warmup", response_model=WarmupProgress)
+async def start_warmup():
+    """Запуск прогрева кэша в фоне (если он ещё не идёт)"""
+    if app.state.warmup.state != "running":
+        app.state.warmup = WarmupProgress(state="running")
+        app.state.warmup_task = asyncio.create_task(run_warmup())
+    return app.state.warmup
+
+
+@app.get("/admin/warmup", response_model=WarmupProgress)
+async def warmup_status():
+    """Прогресс прогрева кэша"""
+    return app.state.warmup
+
+
+async def benchmark_cli():
+    await open_connections(app)
+    try:
+        print(json.dumps(await benchmark_attendance_engines(), ensure_ascii=False, indent=2))
+    finally:
+        await close_connections(app)
+
+
+async def warmup_cli():
+    await open_connections(app)
+    # lifespan в CLI не выполняется: без этого ошибка прогрева подменилась бы AttributeError
+    app.state.warmup = WarmupProgress()
+    try:
+        progress = await run_warmup()
+        print(progress.model_dump_json())
+    finally:
+        await close_connections(app)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["warmup"]:
+        # python -m app_1.main_1 warmup
+        asyncio.run(warmup_cli())
+    elif sys.argv[1:2] == ["bench-attendance"]:
+        # python -m app_1.main_1 bench-attendance
+        asyncio.run(benchmark_cli())
+    else:
+        uvicorn.run(
+            "app_1.main_1:app",
+            host="127.0.0.1",
+            port=8001,
+            workers=1
+        )
@@ -1,11 +1,14 @@
 from __future__ import annotations
 
+import asyncio
 from contextlib import asynccontextmanager
 import logging
 from typing import List, Optional
-from datetime import datetime
+from datetime import date, datetime
 import json
 from json import JSONEncoder
+import hashlib
+import re
 
 import uvicorn
 from fastapi import FastAPI, HTTPException
@@ -16,6 +19,8 @@ from neo4j import AsyncGraphDatabase
 import aioredis
 from pypika import Query as PypikaQuery, Table
 
+from common.dataloader import DataLoader, dataloader_scope, request_loader
+
 class CustomJSONEncoder(JSONEncoder):
     def default(self, obj):
         if isinstance(obj, datetime):
@@ -48,14 +53,75 @@ if not logger.handlers:
     logger.propagate = False
 
 
-CACHE_TTL = 60
+CACHE_TTL = 60 * 60 * 6
+# Окно, захватывающее сегодняшний день, ещё пополняется занятиями и студентами
+LIVE_PERIOD_CACHE_TTL = 60
+# Закрытые периоды не меняются — их сбрасывает только инвалидация по тегам (main.py)
+HISTORICAL_CACHE_TTL = 60 * 60 * 24 * 30
+# Наборы тегов живут не меньше самой долгой записи, иначе запись «потеряется» для инвалидации
+CACHE_TAG_TTL = HISTORICAL_CACHE_TTL
+# Отрицательные ответы (404) кэшируются коротко: данные могут появиться в любой момент
+NEGATIVE_CACHE_TTL = 60 * 5
+NEGATIVE_CACHE_MARKER = "__not_found__"
+# Более длинные ключи заменяются хэшем
+MAX_CACHE_KEY_LENGTH = 200
+
+DATE_ARG_RE = re.compile(r"^\d{4}-\d{1,2}-\d{1,2}$")
+
+def normalize_term(term: str) -> str:
+    """Приведение строки поиска к каноничному виду: регистр и пробелы не важны"""
+    return " ".join(term.split()).casefold()
+
+def canonical_cache_arg(arg) -> str:
+    """Каноничное строковое представление аргумента ключа кэша"""
+    if arg is None:
+        return ""
+    if isinstance(arg, (date, datetime)):
+        return arg.isoformat()
+    if isinstance(arg, str):
+        if DATE_ARG_RE.match(arg.strip()):
+            try:
+                return datetime.strptime(arg.strip(), "%Y-%m-%d").date().isoformat()
+            except ValueError:
+                pass
+        return normalize_term(arg)
+    return str(arg)
 
 def generate_cache_key(prefix: str, *args) -> str:
-    """Генерация уникального ключа кэша из префикса и аргументов"""
-    key_parts = [prefix] + [str(arg) for arg in args]
+    """Генерация уникального ключа кэша из префикса и канонизированных аргументов"""
+    key_parts = [prefix] + [canonical_cache_arg(arg) for arg in args]
     key_string = ":".join(key_parts)
+    if len(key_string) > MAX_CACHE_KEY_LENGTH:
+        digest = hashlib.sha1(key_string.encode("utf-8")).hexdigest()
+        key_string = f"{prefix}:sha1:{digest}"
     return key_string
 
+def period_cache_ttl(start: date | None, end: date | None) -> int:
+    """TTL для отчёта за период: прошлое кэшируется надолго, текущее — коротко"""
+    today = date.today()
+    if end is not None and end < today:
+        return HISTORICAL_CACHE_TTL
+    if start is not None and start > today:
+        return CACHE_TTL
+    return LIVE_PERIOD_CACHE_TTL
+
+def semester_period(year: Optional[int], semester: Optional[int]) -> tuple[date | None, date | None]:
+    """
+    Границы периода для фильтров year/semester (семестр 1 — январь–июнь, 2 — июль–декабрь).
+    Без года период не ограничен.
+    """
+    if year is None:
+        return None, None
+    if semester is None:
+        return date(year, 1, 1), date(year, 12, 31)
+    if semester == 1:
+        return date(year, 1, 1), date(year, 6, 30)
+    return date(year, 7, 1), date(year, 12, 31)
+
+def cache_tag_key(tag: str) -> str:
+    """Ключ Redis-множества, хранящего ключи кэша, зависящие от тега"""
+    return f"cache_tag:{tag}"
+
 async def get_cached_data(redis, key: str):
     """Получение данных из Redis кэша"""
     data = await redis.get(key)
@@ -65,10 +131,24 @@ async def get_cached_data(redis, key: str):
     logger.info(f"Cache miss: {key}")
     return None
 
-async def set_cached_data(redis, key: str, data, ttl: int = CACHE_TTL):
-    """Сохранение данных в Redis кэш с указанным TTL"""
-    await redis.set(key, json.dumps(data, cls=CustomJSONEncoder), ex=ttl)
-    logger.info(f"Cached: {key}, TTL: {ttl}")
+async def set_cached_data(redis, key: str, data, ttl: int = CACHE_TTL, tags=()):
+    """Сохранение данных в Redis кэш с указанным TTL и привязкой к тегам сущностей"""
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.set(key, json.dumps(data, cls=CustomJSONEncoder), ex=ttl)
+        for tag in tags:
+            pipe.sadd(cache_tag_key(tag), key)
+            pipe.expire(cache_tag_key(tag), CACHE_TAG_TTL)
+        await pipe.execute()
+    logger.info(f"Cached: {key}, TTL: {ttl}, tags: {len(tags)}")
+
+async def set_negative_cache(redis, key: str, detail: str, tags=()):
+    """Кэширование ответа «не найдено» с коротким TTL"""
+    await set_cached_data(redis, key, {NEGATIVE_CACHE_MARKER: detail}, ttl=NEGATIVE_CACHE_TTL, tags=tags)
+
+def raise_if_negative(cached) -> None:
+    """Повторяет закэшированный 404 без обращения к хранилищам"""
+    if isinstance(cached, dict) and NEGATIVE_CACHE_MARKER in cached:
+        raise HTTPException(status_code=404, detail=cached[NEGATIVE_CACHE_MARKER])
 
 
 @asynccontextmanager
@@ -88,6 +168,8 @@ async def lifespan(app: FastAPI):
     logger.info("Все соединения закрыты")
 
 app = FastAPI(title="App2 Service", lifespan=lifespan)
+# DataLoader общий для сервисов: common/dataloader.py
+app.middleware("http")(dataloader_scope)
 
 
 class CourseReport(BaseModel):
@@ -120,7 +202,8 @@ async def fetch_classes(pool, course_title, year, semester, requirements=None):
             cl.date,
             cl.duration,
             cl.requirements,
-            cl.class_id
+            cl.class_id,
+            c.course_id
         )
         .where(c.title.ilike(f'%{course_title}%'))
     )
@@ -145,31 +228,40 @@ async def fetch_classes(pool, course_title, year, semester, requirements=None):
     logger.info(f"Найдено {len(classes)} подходящих занятий")
     return classes
 
-async def fetch_student_count(neo4j_driver, class_info) -> int:
+async def fetch_student_counts(keys) -> dict:
     """
-    Подсчёт всех студентов, принадлежащих группе, для которой в расписании
-    есть указанный курс (независимо от факта посещения).
+    Подсчёт всех студентов групп, в расписании которых есть занятие
+    (название, дата), независимо от факта посещения — для пакета занятий
+    одним запросом к Neo4j.
     """
-    logger.info(f"Подсчет студентов для занятия: {class_info['class_title']} ({class_info['date']})")
-    
     cypher = """
+        UNWIND $keys AS key
         MATCH (s:Student)-[:BELONGS_TO]->(g:Group)-[:HAS_SCHEDULE]->(sch:Schedule {
-            title: $title,
-            date: date($date)
+            title: key.title,
+            date: date(key.date)
         })
-        RETURN COUNT(DISTINCT s) AS student_count
+        RETURN key.title AS title, key.date AS date, COUNT(DISTINCT s) AS student_count
     """
-    async with neo4j_driver.session() as session:
-        result = await session.run(
-            cypher,
-            title=class_info["class_title"],
-            date=class_info["date"].strftime('%Y-%m-%d')
-        )
-        record = await result.single()
-        count = record["student_count"] if record else 0
-        logger.info(f"Найдено {count} студентов для занятия «{class_info['class_title']}»")
-        return count
+    async with app.state.neo4j.session() as session:
+        result = await session.run(cypher, keys=[{"title": title, "date": day} for title, day in keys])
+        counts = {(record["title"], record["date"]): record["student_count"] async for record in result}
+    logger.info(f"Подсчет студентов: {len(keys)} занятий одним запросом")
+    return counts
+
+
+LOADERS = {
+    "student_counts": fetch_student_counts,
+}
+
 
+def loader(entity: str) -> DataLoader:
+    return request_loader(LOADERS, entity)
+
+
+async def fetch_student_count(class_info) -> int:
+    """Число студентов занятия; занятия одного запроса считаются одним пакетом."""
+    key = (class_info["class_title"], class_info["date"].strftime('%Y-%m-%d'))
+    return await loader("student_counts").load(key) or 0
 
 
 @app.get("/api/course-attendance/{course_title}", response_model=List[CourseReport])
@@ -183,27 +275,32 @@ async def get_course_attendance(
     Генерация отчета о посещаемости курса с опциональной фильтрацией
 
     """
+    # ILIKE не различает регистр, поэтому варианты написания сводятся к одному ключу
+    course_title = normalize_term(course_title)
+    requirements = normalize_term(requirements) if requirements else None
     logger.info(f"Генерация отчета о посещаемости для: course_title={course_title}, year={year}, semester={semester}, requirements={requirements}")
 
 
     cache_key = generate_cache_key("course_attendance", course_title, year, semester, requirements)
     cached_data = await get_cached_data(app.state.redis, cache_key)
     if cached_data:
+        raise_if_negative(cached_data)
         logger.info("Возврат данных из кэша")
         return [CourseReport(**item) for item in cached_data]
 
     pool = app.state.db
-    neo4j_driver = app.state.neo4j
-    
+
 
     classes = await fetch_classes(pool, course_title, year, semester, requirements)
     if not classes:
         logger.warning("Курс или занятия не найдены")
-        raise HTTPException(status_code=404, detail="Course or classes not found")
+        detail = "Course or classes not found"
+        await set_negative_cache(app.state.redis, cache_key, detail, tags=["courses"])
+        raise HTTPException(status_code=404, detail=detail)
 
+    counts = await asyncio.gather(*(fetch_student_count(class_info) for class_info in classes))
     results = []
-    for class_info in classes:
-        student_count = await fetch_student_count(neo4j_driver, class_info)
+    for class_info, student_count in zip(classes, counts):
         results.append(CourseReport(
             course_title=class_info["course_title"],
             class_title=class_info["class_title"],
@@ -215,7 +312,9 @@ async def get_course_attendance(
             student_count_planned=student_count
         ))
 
-    await set_cached_data(app.state.redis, cache_key, [r.model_dump() for r in results])
+    tags = {f"course:{class_info['course_id']}" for class_info in classes}
+    ttl = period_cache_ttl(*semester_period(year, semester))
+    await set_cached_data(app.state.redis, cache_key, [r.model_dump() for r in results], ttl=ttl, tags=tags)
     
     logger.info(f"Отчет успешно сгенерирован: {len(results)} занятий")
     return results
@@ -1,10 +1,15 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import json
 import logging
+import sys
+import time
+from collections import Counter
 from contextlib import asynccontextmanager
-from typing import List, Tuple, Dict
-from datetime import datetime
+from typing import List, Optional, Tuple, Dict
+from datetime import date, datetime, timedelta
 from json import JSONEncoder
 
 import uvicorn
@@ -17,6 +22,14 @@ from neo4j import AsyncGraphDatabase
 from pypika import Query as PypikaQuery, Table
 from pypika.functions import Count, Sum
 
+from common.dataloader import DataLoader, dataloader_scope, pg_batch, request_loader
+from common.snapshot import AttendanceSnapshot, snapshot_version
+
+try:
+    import numpy as np
+except ImportError:  # снимок посещаемости необязателен: без NumPy отвечает только Neo4j
+    np = None
+
 
 class CustomJSONEncoder(JSONEncoder):
     def default(self, obj):
@@ -31,6 +44,17 @@ class Settings(BaseSettings):
     neo4j_uri: str = Field(..., env="NEO4J_URI")
     neo4j_user: str = Field(..., env="NEO4J_USER")
     neo4j_password: str = Field(..., env="NEO4J_PASSWORD")
+    # прогрев кэша: популярные группы и (по умолчанию) все группы из PostgreSQL
+    warmup_on_startup: bool = Field(True, env="WARMUP_ON_STARTUP")
+    warmup_concurrency: int = Field(4, env="WARMUP_CONCURRENCY")
+    warmup_popular_limit: int = Field(50, env="WARMUP_POPULAR_LIMIT")
+    warmup_all_groups: bool = Field(True, env="WARMUP_ALL_GROUPS")
+    warmup_group_ids: List[int] = Field(default_factory=list, env="WARMUP_GROUP_IDS")
+    # источник часов: "neo4j", "snapshot" (снимок в памяти, нужен NumPy),
+    # "bitmap" (битовые индексы в Redis), "rollup" (недельные агрегаты в PostgreSQL)
+    # или "matview" (материализованное представление group_hours_mv)
+    attendance_engine: str = Field("neo4j", env="ATTENDANCE_ENGINE")
+    snapshot_refresh_seconds: int = Field(60, env="SNAPSHOT_REFRESH_SECONDS")
 
     class Config:
         env_file = ".env"
@@ -49,11 +73,33 @@ if not logger.handlers:
     logger.addHandler(handler)
     logger.propagate = False
 
-CACHE_TTL = 60
+CACHE_TTL = 60 * 60 * 6
+# Наборы тегов живут не меньше самой долгой записи, иначе запись «потеряется» для инвалидации
+# (совпадает с HISTORICAL_CACHE_TTL остальных сервисов: множества тегов общие)
+CACHE_TAG_TTL = 60 * 60 * 24 * 30
+# Отрицательные ответы (404) кэшируются коротко
+NEGATIVE_CACHE_TTL = 60 * 5
+NEGATIVE_CACHE_MARKER = "__not_found__"
+MAX_CACHE_KEY_LENGTH = 200
+
+
+def canonical_cache_arg(arg) -> str:
+    if arg is None:
+        return ""
+    if isinstance(arg, str):
+        return " ".join(arg.split()).casefold()
+    return str(arg)
 
 
 def generate_cache_key(prefix: str, *args) -> str:
-    return ":".join([prefix, *map(str, args)])
+    key = ":".join([prefix, *map(canonical_cache_arg, args)])
+    if len(key) > MAX_CACHE_KEY_LENGTH:
+        key = f"{prefix}:sha1:{hashlib.sha1(key.encode('utf-8')).hexdigest()}"
+    return key
+
+
+def cache_tag_key(tag: str) -> str:
+    return f"cache_tag:{tag}"
 
 
 async def get_cached_data(redis, key: str):
@@ -64,29 +110,81 @@ async def get_cached_data(redis, key: str):
     logger.info("Cache miss: %s", key)
     return None
 
-async def set_cached_data(redis, key: str, data, ttl: int = CACHE_TTL):
-    await redis.set(key, json.dumps(data, cls=CustomJSONEncoder), ex=ttl)
+async def set_cached_data(redis, key: str, data, ttl: int = CACHE_TTL, tags=()):
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.set(key, json.dumps(data, cls=CustomJSONEncoder), ex=ttl)
+        for tag in tags:
+            pipe.sadd(cache_tag_key(tag), key)
+            pipe.expire(cache_tag_key(tag), CACHE_TAG_TTL)
+        await pipe.execute()
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    logger.info("Starting Lab-3 Service...")
+async def set_negative_cache(redis, key: str, detail: str, tags=()):
+    await set_cached_data(redis, key, {NEGATIVE_CACHE_MARKER: detail}, ttl=NEGATIVE_CACHE_TTL, tags=tags)
+
+
+def raise_if_negative(cached) -> None:
+    if isinstance(cached, dict) and NEGATIVE_CACHE_MARKER in cached:
+        raise HTTPException(404, cached[NEGATIVE_CACHE_MARKER])
+
+
+async def open_connections(app: FastAPI):
     app.state.db = await asyncpg.create_pool(settings.postgres_dsn)
     app.state.redis = aioredis.from_url(settings.redis_dsn, decode_responses=True)
     app.state.neo4j = AsyncGraphDatabase.driver(
         settings.neo4j_uri,
         auth=(settings.neo4j_user, settings.neo4j_password)
     )
-    yield
-    logger.info("Shutting down...")
+
+
+async def close_connections(app: FastAPI):
     await app.state.db.close()
     await app.state.redis.close()
     await app.state.neo4j.close()
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logger.info("Starting Lab-3 Service...")
+    await open_connections(app)
+    app.state.warmup = WarmupProgress()
+    app.state.warmup_task = None
+    app.state.snapshot = None
+    app.state.snapshot_task = None
+    if snapshot_enabled():
+        # до первой загрузки снимка запросы идут в Neo4j
+        app.state.snapshot_task = asyncio.create_task(snapshot_refresher())
+    if settings.warmup_on_startup:
+        # прогрев идёт в фоне сразу после готовности сервиса
+        app.state.warmup_task = asyncio.create_task(run_warmup())
+    yield
+    logger.info("Shutting down...")
+    for task in (app.state.warmup_task, app.state.snapshot_task):
+        if task is not None:
+            task.cancel()
+    await close_connections(app)
+
+
 app = FastAPI(title="App3 Service", lifespan=lifespan)
 
 
+# ───── пакетная загрузка справочников в пределах запроса ─────────────────────
+# DataLoader общий для сервисов: common/dataloader.py
+app.middleware("http")(dataloader_scope)
+
+LOADERS = {
+    "groups":   pg_batch(lambda: app.state.db,
+                         "SELECT group_id, name, year, spec_id FROM groups WHERE group_id = ANY($1::int[])"),
+    "students": pg_batch(lambda: app.state.db,
+                         "SELECT student_id, full_name, code, group_id FROM students "
+                         "WHERE student_id = ANY($1::int[])"),
+}
+
+
+def loader(entity: str) -> DataLoader:
+    return request_loader(LOADERS, entity)
+
+
 class CourseInfo(BaseModel):
     course_id: int
     course_title: str
@@ -106,14 +204,8 @@ class GroupReport(BaseModel):
     students: List[StudentInfo]
 
 
-async def fetch_group_code(pg_pool, group_id: int) -> str:
-    groups = Table("groups")
-    q = (
-        PypikaQuery.from_(groups)
-        .select(groups.name)
-        .where(groups.group_id == group_id)
-    )
-    row = await pg_pool.fetchrow(q.get_sql())
+async def fetch_group_code(group_id: int) -> str:
+    row = await loader("groups").load(group_id)
     if not row:
         raise HTTPException(404, "Group not found in PostgreSQL")
     return row["name"]
@@ -150,23 +242,6 @@ async def fetch_neo4j_planned_hours(driver, group_code: str) -> Dict[Tuple[int,
     return planned
 
 
-
-
-async def fetch_course_titles(pg_pool, course_ids: List[int]) -> Dict[int, str]:
-    if not course_ids:
-        return {}
-
-    courses = Table("courses")
-    q = (
-        PypikaQuery.from_(courses)
-        .select(courses.course_id, courses.title)
-        .where(courses.course_id.isin(course_ids))
-    )
-    rows = await pg_pool.fetch(q.get_sql())
-
-    return {r["course_id"]: r["title"] for r in rows}
-
-
 async def fetch_neo4j_attended_hours(driver, group_code: str) -> Dict[Tuple[int, int], int]:
     query = """
         MATCH (g:Group {code: $group_code})<-[:BELONGS_TO]-(s:Student)
@@ -209,21 +284,288 @@ async def fetch_neo4j_students(driver, group_code: str) -> Dict[int, str]:
     return students
 
 
+# ───── битовые индексы посещаемости ──────────────────────────────────────────
+# Индексы строит и обновляет main.py (bitmap:attended:<shedule_id>,
+# bitmap:group:<group_id>, значение "<base>:<hex>"); сервис только читает.
+BITMAP_ATTENDED_PREFIX = "bitmap:attended"
+BITMAP_GROUP_PREFIX    = "bitmap:group"
+BITMAP_READY_KEY       = "bitmap:ready"
+GROUP_SCHEDULES_SQL = """
+    SELECT sh.shedule_id, c.course_id, c.title AS course_title
+    FROM shedule     sh
+    JOIN classes     cl ON cl.class_id = sh.class_id
+    JOIN courses     c  ON c.course_id = cl.course_id
+    JOIN specialties sp ON sp.spec_id  = c.spec_id
+    JOIN groups      g  ON g.spec_id   = sp.spec_id
+    WHERE g.group_id = $1 AND cl.tag = $2
+"""
+
+
+def decode_bitset(value) -> int:
+    if not value:
+        return 0
+    base, bits = value.split(":")
+    return int(bits, 16) << int(base)
+
+
+def bit_positions(bits: int):
+    """Номера установленных битов по возрастанию."""
+    digits = bin(bits)[:1:-1]
+    i = digits.find("1")
+    while i != -1:
+        yield i
+        i = digits.find("1", i + 1)
+
+
+class BitCounter:
+    """
+    Поразрядный (bit-sliced) счётчик: i-й битсет хранит i-й разряд счётчика
+    каждого студента. Добавление битсета — сложение с переносом через AND/XOR.
+    """
+
+    def __init__(self):
+        self.planes: List[int] = []
+
+    def add(self, bits: int) -> None:
+        for i, plane in enumerate(self.planes):
+            if not bits:
+                return
+            self.planes[i], bits = plane ^ bits, plane & bits
+        if bits:
+            self.planes.append(bits)
+
+    def counts(self, positions) -> Dict[int, int]:
+        digits = [bin(plane)[:1:-1] for plane in self.planes]
+        return {
+            pos: sum(1 << i for i, d in enumerate(digits) if pos < len(d) and d[pos] == "1")
+            for pos in positions
+        }
+
+
+async def fetch_bitmap_group_hours(pool, redis, group_id: int):
+    """
+    То же, что fetch_neo4j_group_hours, по битовым индексам: посещения каждого
+    расписания пересекаются с составом группы и суммируются по курсам.
+    None, если индексы ещё не собраны.
+    """
+    if not await redis.exists(BITMAP_READY_KEY):
+        return None
+    rows = await pool.fetch(GROUP_SCHEDULES_SQL, group_id, SPECIAL_TAG)
+    if not rows:
+        return {}, {}, {}
+
+    schedule_ids = [r["shedule_id"] for r in rows]
+    raw = await redis.mget(
+        [f"{BITMAP_GROUP_PREFIX}:{group_id}"]
+        + [f"{BITMAP_ATTENDED_PREFIX}:{sch}" for sch in schedule_ids]
+    )
+    members = decode_bitset(raw[0])
+    if not members:
+        return {}, {}, {}
+
+    courses: Dict[int, Dict] = {}
+    for r, value in zip(rows, raw[1:]):
+        course = courses.setdefault(r["course_id"], {
+            "course_title": r["course_title"], "lectures": 0, "counter": BitCounter(),
+        })
+        course["lectures"] += 1
+        course["counter"].add(decode_bitset(value) & members)
+
+    student_ids = list(bit_positions(members))
+    names = await loader("students").load_many(student_ids)
+    students = {sid: r["full_name"] for sid, r in names.items()}
+
+    planned, attended = {}, {}
+    for course_id, course in courses.items():
+        counts = course["counter"].counts(student_ids)
+        for sid in student_ids:
+            planned[(sid, course_id)] = {
+                "course_title":  course["course_title"],
+                "planned_hours": course["lectures"] * 2,
+            }
+            attended[(sid, course_id)] = counts[sid] * 2
+    return planned, attended, students
+
+# ───── недельные агрегаты посещаемости ───────────────────────────────────────
+# attendance_rollup ведёт main.py (init/postgres/rollup-attendance.sql);
+# часы группы — сумма недельных строк её студентов по спецзанятиям курса.
+ROLLUP_GROUP_HOURS_SQL = """
+    SELECT r.student_id, s.full_name, r.course_id, c.title AS course_title,
+           sum(r.planned) * 2  AS planned_hours,
+           sum(r.attended) * 2 AS attended_hours
+    FROM students          s
+    JOIN attendance_rollup r  ON r.student_id = s.student_id
+    JOIN classes           cl ON cl.class_id  = r.class_id
+    JOIN courses           c  ON c.course_id  = r.course_id
+    WHERE s.group_id = $1 AND cl.tag = $2
+    GROUP BY r.student_id, s.full_name, r.course_id, c.title
+"""
+
+
+def group_hours_from_rows(rows):
+    """(planned, attended, students) в формате fetch_neo4j_group_hours по строкам студент × курс."""
+    planned, attended, students = {}, {}, {}
+    for r in rows:
+        key = (r["student_id"], r["course_id"])
+        planned[key] = {
+            "course_title":  r["course_title"],
+            "planned_hours": r["planned_hours"],
+        }
+        attended[key] = r["attended_hours"]
+        students[r["student_id"]] = r["full_name"]
+    return planned, attended, students
+
+
+async def fetch_rollup_group_hours(pool, group_id: int):
+    """То же, что fetch_neo4j_group_hours, по недельным агрегатам; None, если таблицы ещё нет."""
+    try:
+        rows = await pool.fetch(ROLLUP_GROUP_HOURS_SQL, group_id, SPECIAL_TAG)
+    except asyncpg.exceptions.UndefinedTableError:
+        logger.warning("attendance_rollup is missing, falling back to Neo4j")
+        return None
+    return group_hours_from_rows(rows)
+
+
+# ───── материализованное представление часов групп ───────────────────────────
+# group_hours_mv (init/postgres/view-group-hours.sql) хранит готовые строки
+# студент × курс; main.py обновляет его CONCURRENTLY после каждой записи.
+MATVIEW_GROUP_HOURS_SQL = """
+    SELECT student_id, full_name, course_id, course_title, planned_hours, attended_hours
+    FROM group_hours_mv
+    WHERE group_id = $1
+"""
+
+
+async def fetch_matview_group_hours(pool, group_id: int):
+    """То же, что fetch_neo4j_group_hours, из group_hours_mv; None, если представления ещё нет."""
+    try:
+        rows = await pool.fetch(MATVIEW_GROUP_HOURS_SQL, group_id)
+    except asyncpg.exceptions.UndefinedTableError:
+        logger.warning("group_hours_mv is missing, falling back to Neo4j")
+        return None
+    return group_hours_from_rows(rows)
+
+
+# ───── колоночный снимок посещаемости ────────────────────────────────────────
+SPECIAL_TAG = "специальная"
+
+
+def snapshot_enabled() -> bool:
+    return settings.attendance_engine == "snapshot" and np is not None
+
+
+async def refresh_snapshot(force: bool = False) -> bool:
+    """Перестраивает снимок, если в журнале graph_outbox появились изменения."""
+    current = getattr(app.state, "snapshot", None)
+    if not force and current is not None:
+        if await snapshot_version(app.state.db) == current.version:
+            return False
+    started = time.perf_counter()
+    app.state.snapshot = await AttendanceSnapshot.load(
+        app.state.db, tag=SPECIAL_TAG, names=True, views=("groups",)
+    )
+    logger.info("Attendance snapshot loaded in %.2fs: %d students, %d schedules",
+                time.perf_counter() - started, len(app.state.snapshot.student_ids),
+                len(app.state.snapshot.schedule_ids))
+    return True
+
+
+async def snapshot_refresher():
+    while True:
+        try:
+            await refresh_snapshot()
+        except Exception as e:
+            # пока снимок не обновлён, отвечает прежний снимок или Neo4j
+            logger.error("Attendance snapshot refresh failed: %s", e)
+        await asyncio.sleep(settings.snapshot_refresh_seconds)
+
+
+async def fetch_neo4j_group_hours(driver, group_code: str):
+    planned = await fetch_neo4j_planned_hours(driver, group_code)
+    if not planned:
+        return {}, {}, {}
+    attended = await fetch_neo4j_attended_hours(driver, group_code)
+    students = await fetch_neo4j_students(driver, group_code)
+    return planned, attended, students
+
+
+async def fetch_group_hours(group_id: int, group_code: str):
+    """Плановые и посещённые часы группы из выбранного движка; пока он не готов — из Neo4j."""
+    snapshot = getattr(app.state, "snapshot", None)
+    if snapshot_enabled() and snapshot is not None:
+        return snapshot.group_hours(group_id)
+    if settings.attendance_engine == "bitmap":
+        hours = await fetch_bitmap_group_hours(app.state.db, app.state.redis, group_id)
+        if hours is not None:
+            return hours
+    if settings.attendance_engine == "rollup":
+        hours = await fetch_rollup_group_hours(app.state.db, group_id)
+        if hours is not None:
+            return hours
+    if settings.attendance_engine == "matview":
+        hours = await fetch_matview_group_hours(app.state.db, group_id)
+        if hours is not None:
+            return hours
+    return await fetch_neo4j_group_hours(app.state.neo4j, group_code)
+
+
+async def benchmark_attendance_engines(rounds: int = 20) -> dict:
+    """
+    Сравнение времени ответа по группам: Neo4j, снимок в памяти, битовые индексы,
+    недельные агрегаты и материализованное представление. Снимок — только при наличии NumPy.
+    """
+    rows = await app.state.db.fetch("SELECT group_id, name FROM groups ORDER BY group_id LIMIT $1", rounds)
+
+    engines = [
+        ("neo4j", lambda gid, code: fetch_neo4j_group_hours(app.state.neo4j, code)),
+        ("bitmap", lambda gid, code: fetch_bitmap_group_hours(app.state.db, app.state.redis, gid)),
+        ("rollup", lambda gid, code: fetch_rollup_group_hours(app.state.db, gid)),
+        ("matview", lambda gid, code: fetch_matview_group_hours(app.state.db, gid)),
+    ]
+    if np is not None:
+        await refresh_snapshot(force=True)
+        snapshot = app.state.snapshot
+        engines.insert(1, ("snapshot", lambda gid, code: asyncio.to_thread(snapshot.group_hours, gid)))
+
+    timings = {}
+    for name, fetch in engines:
+        samples = []
+        for row in rows:
+            started = time.perf_counter()
+            await fetch(row["group_id"], row["name"])
+            samples.append((time.perf_counter() - started) * 1000)
+        samples.sort()
+        timings[name] = {
+            "p50_ms": round(samples[len(samples) // 2], 2),
+            "p95_ms": round(samples[max(int(len(samples) * 0.95) - 1, 0)], 2),
+        }
+    return {"groups": len(rows), **timings}
+
+
 @app.get("/api/group-hours/{group_id}", response_model=GroupReport)
 async def get_group_hours(group_id: int = Path(..., ge=1)):
+    await record_request_popularity(app.state.redis, "group_hours", group_id)
+    return await build_group_report(group_id)
+
+
+async def build_group_report(group_id: int) -> GroupReport:
+    """Отчёт по группе с кэшированием — общий путь для запросов и прогрева."""
     cache_key = generate_cache_key("group_hours", group_id)
 
     if cached := await get_cached_data(app.state.redis, cache_key):
+        raise_if_negative(cached)
         return GroupReport.model_validate(cached)
 
-    group_code = await fetch_group_code(app.state.db, group_id)
-
-    planned   = await fetch_neo4j_planned_hours(app.state.neo4j, group_code)
-    if not planned:
-        raise HTTPException(404, "No planned lectures found")
+    try:
+        group_code = await fetch_group_code(group_id)
 
-    attended  = await fetch_neo4j_attended_hours(app.state.neo4j, group_code)
-    students  = await fetch_neo4j_students(app.state.neo4j, group_code)
+        planned, attended, students = await fetch_group_hours(group_id, group_code)
+        if not planned:
+            raise HTTPException(404, "No planned lectures found")
+    except HTTPException as e:
+        if e.status_code == 404:
+            await set_negative_cache(app.state.redis, cache_key, e.detail, tags=[f"group:{group_id}"])
+        raise
 
 
     students_map: Dict[int, StudentInfo] = {}
@@ -251,14 +593,148 @@ async def get_group_hours(group_id: int = Path(..., ge=1)):
         students=list(students_map.values())
     )
 
-    await set_cached_data(app.state.redis, cache_key, report.model_dump())
+    tags = {f"group:{group_id}", *(f"course:{crs_id}" for _, crs_id in planned)}
+    await set_cached_data(app.state.redis, cache_key, report.model_dump(), tags=tags)
     return report
 
 
+# ───── прогрев кэша ──────────────────────────────────────────────────────────
+POPULARITY_DAYS = 7
+
+
+class WarmupProgress(BaseModel):
+    state: str = "idle"            # idle | running | done | failed
+    total: int = 0
+    done: int = 0
+    failed: int = 0
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+async def record_request_popularity(redis, prefix: str, member) -> None:
+    key = f"popular:{prefix}:{date.today().isoformat()}"
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.zincrby(key, 1, str(member))
+        pipe.expire(key, POPULARITY_DAYS * 24 * 60 * 60)
+        await pipe.execute()
+
+
+async def popular_requests(redis, prefix: str, limit: int) -> List[str]:
+    """Самые частые запросы за последние POPULARITY_DAYS дней."""
+    today = date.today()
+    async with redis.pipeline(transaction=False) as pipe:
+        for days_ago in range(POPULARITY_DAYS):
+            key = f"popular:{prefix}:{(today - timedelta(days=days_ago)).isoformat()}"
+            pipe.zrevrange(key, 0, limit - 1, withscores=True)
+        daily = await pipe.execute()
+
+    scores = Counter()
+    for ranking in daily:
+        for member, score in ranking:
+            scores[member] += score
+    return [member for member, _ in scores.most_common(limit)]
+
+
+async def warmup_group_ids() -> List[int]:
+    """Популярные группы первыми, затем настроенные и все остальные."""
+    popular = await popular_requests(app.state.redis, "group_hours", settings.warmup_popular_limit)
+    group_ids = [int(gid) for gid in popular] + list(settings.warmup_group_ids)
+    if settings.warmup_all_groups:
+        groups = Table("groups")
+        rows = await app.state.db.fetch(
+            PypikaQuery.from_(groups).select(groups.group_id).orderby(groups.group_id).get_sql()
+        )
+        group_ids += [r["group_id"] for r in rows]
+    return list(dict.fromkeys(group_ids))
+
+
+async def warm_cache(group_ids: List[int], concurrency: int) -> WarmupProgress:
+    progress = app.state.warmup = WarmupProgress(
+        state="running", total=len(group_ids), started_at=datetime.utcnow()
+    )
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def warm_one(group_id: int):
+        async with semaphore:
+            try:
+                await build_group_report(group_id)
+            except HTTPException as e:
+                # 404 кэшируется как отрицательный ответ — прогрев удался
+                if e.status_code != 404:
+                    progress.failed += 1
+            except Exception as e:
+                logger.warning("Warmup failed for group %s: %s", group_id, e)
+                progress.failed += 1
+            progress.done += 1
+            logger.info("Warmup progress: %d/%d (failed: %d)", progress.done, progress.total, progress.failed)
+
+    await asyncio.gather(*(warm_one(gid) for gid in group_ids))
+    progress.state = "done"
+    progress.finished_at = datetime.utcnow()
+    return progress
+
+
+async def run_warmup() -> WarmupProgress:
+    try:
+        group_ids = await warmup_group_ids()
+        logger.info("Cache warmup: %d groups", len(group_ids))
+        return await warm_cache(group_ids, settings.warmup_concurrency)
+    except Exception:
+        logger.exception("Cache warmup aborted")
+        app.state.warmup.state = "failed"
+        return app.state.warmup
+    finally:
+        # ни сбой, ни отмена задачи не оставляют прогрев в состоянии running
+        progress = app.state.warmup
+        if progress.state == "running":
+            progress.state = "failed"
+        if progress.finished_at is None:
+            progress.finished_at = datetime.utcnow()
+
+
+@app.post("/admin/warmup", response_model=WarmupProgress)
+async def start_warmup():
+    if app.state.warmup.state != "running":
+        app.state.warmup = WarmupProgress(state="running")
+        app.state.warmup_task = asyncio.create_task(run_warmup())
+    return app.state.warmup
+
+
+@app.get("/admin/warmup", response_model=WarmupProgress)
+async def warmup_status():
+    return app.state.warmup
+
+
+async def benchmark_cli():
+    await open_connections(app)
+    try:
+        print(json.dumps(await benchmark_attendance_engines(), ensure_ascii=False, indent=2))
+    finally:
+        await close_connections(app)
+
+
+async def warmup_cli():
+    await open_connections(app)
+    # lifespan в CLI не выполняется: без этого ошибка прогрева подменилась бы AttributeError
+    app.state.warmup = WarmupProgress()
+    try:
+        progress = await run_warmup()
+        print(progress.model_dump_json())
+    finally:
+        await close_connections(app)
+
+
 if __name__ == "__main__":
-    uvicorn.run(
-        "app:app",
-        host="0.0.0.0",
-        port=8003,
-        reload=True
-    )
\ No newline at end of file
+    if sys.argv[1:2] == ["warmup"]:
+        # python -m app_3.main_3 warmup
+        asyncio.run(warmup_cli())
+    elif sys.argv[1:2] == ["bench-attendance"]:
+        # python -m app_3.main_3 bench-attendance
+        asyncio.run(benchmark_cli())
+    else:
+        uvicorn.run(
+            "app:app",
+            host="0.0.0.0",
+            port=8003,
+            reload=True
+        )
\ No newline at end of file
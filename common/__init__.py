@@ -0,0 +1,8 @@
+"""
+Общие модули сервисов app_1–app_3.
+
+В образ сервиса каталог попадает через дополнительный контекст сборки
+(`additional_contexts: common: ./common` в docker-compose.yaml и
+`COPY --from=common . ./common` в Dockerfile). Локально сервисы запускаются
+из корня репозитория (`uvicorn app_1.main_1:app`), тогда common уже в sys.path.
+"""
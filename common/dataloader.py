@@ -0,0 +1,91 @@
+"""
+Пакетная загрузка справочников в пределах HTTP-запроса.
+
+Ключи, запрошенные за один проход цикла событий (из любых веток кода),
+уходят в batch-функцию одним вызовом; результаты запоминаются до конца
+запроса. Сервис описывает batch-функции сущностей словарём и подключает
+dataloader_scope как HTTP-middleware:
+
+    LOADERS = {"groups": pg_batch(lambda: app.state.db, "SELECT ... = ANY($1::int[])")}
+    app.middleware("http")(dataloader_scope)
+    rows = await request_loader(LOADERS, "groups").load_many(group_ids)
+"""
+
+import asyncio
+from contextvars import ContextVar
+
+
+class DataLoader:
+    """batch_fn(keys) возвращает словарь ключ → значение; отсутствующим — None."""
+
+    def __init__(self, batch_fn):
+        self._batch_fn = batch_fn
+        self._futures: dict[object, asyncio.Future] = {}
+        self._queue: list[object] = []
+
+    def load(self, key) -> asyncio.Future:
+        future = self._futures.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._futures[key] = loop.create_future()
+            if not self._queue:
+                # двойной call_soon: задачи, созданные в этом же проходе, успевают добавить ключи
+                loop.call_soon(loop.call_soon, self._dispatch)
+            self._queue.append(key)
+        return future
+
+    async def load_many(self, keys) -> dict:
+        keys = list(dict.fromkeys(keys))
+        values = await asyncio.gather(*(self.load(key) for key in keys))
+        return {key: value for key, value in zip(keys, values) if value is not None}
+
+    def _dispatch(self) -> None:
+        keys, self._queue = self._queue, []
+        asyncio.ensure_future(self._run(keys))
+
+    async def _run(self, keys: list) -> None:
+        try:
+            found = await self._batch_fn(keys)
+        except Exception as e:
+            for key in keys:
+                # ошибка не запоминается: следующий load повторит запрос
+                future = self._futures.pop(key)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key in keys:
+            future = self._futures[key]
+            # ожидавший ключ запрос мог быть отменён — остальные ключи пакета всё равно разрешаются
+            if not future.done():
+                future.set_result(found.get(key))
+            elif future.cancelled():
+                del self._futures[key]
+
+
+def pg_batch(pool, sql: str):
+    """batch-функция по SQL с `= ANY($1)`; ключ — первый столбец, pool() — пул asyncpg."""
+    async def batch(keys):
+        rows = await pool().fetch(sql, keys)
+        return {r[0]: r for r in rows}
+    return batch
+
+
+request_loaders: ContextVar[dict | None] = ContextVar("request_loaders", default=None)
+
+
+def request_loader(batch_fns: dict, entity: str) -> DataLoader:
+    """Загрузчик сущности текущего запроса; вне запроса (прогрев, CLI) — новый на каждый вызов."""
+    scope = request_loaders.get()
+    if scope is None:
+        return DataLoader(batch_fns[entity])
+    if entity not in scope:
+        scope[entity] = DataLoader(batch_fns[entity])
+    return scope[entity]
+
+
+async def dataloader_scope(request, call_next):
+    token = request_loaders.set({})
+    try:
+        return await call_next(request)
+    finally:
+        request_loaders.reset(token)
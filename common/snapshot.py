@@ -0,0 +1,203 @@
+"""
+Колоночный снимок посещаемости в памяти процесса (нужен NumPy).
+
+Снимок отношения студент × расписание: студент → группа, расписание → группы
+(HAS_SCHEDULE) и посещения — только расписаний своей группы, как и путь через
+граф. Поверх ядра строятся CSR-представления под запросы сервисов:
+
+    "schedules" — по расписаниям, для attendance() в app_1;
+    "groups"    — по группам, для group_hours() в app_3.
+
+Версия снимка — маркер журнала graph_outbox (см. SNAPSHOT_VERSION_SQL):
+сервис сверяет её с текущей и перестраивает снимок только после изменений.
+"""
+
+import asyncio
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:  # снимок необязателен: без NumPy сервисы отвечают из Neo4j
+    np = None
+
+# Триггеры graph_outbox стоят на всех таблицах снимка (students, groups, courses,
+# classes, shedule, attendances). Строки журнала удаляются при синхронизации
+# графа, поэтому маркер — видимые в снимке транзакции max(id) и число строк
+# журнала плюс водяной знак и время последней синхронизации: закоммиченное
+# изменение сдвигает хотя бы одно из них. Полная пересборка графа обновляет
+# synced_at, даже если писали без триггеров (generate --replica-role).
+SNAPSHOT_VERSION_SQL = """
+    SELECT concat_ws(':', o.last_id, o.pending, s.watermark, extract(epoch FROM s.synced_at))
+    FROM (SELECT coalesce(max(id), 0) AS last_id, count(*) AS pending FROM graph_outbox) o
+    LEFT JOIN graph_sync_state s ON s.name = 'neo4j'
+"""
+SNAPSHOT_SCHEDULE_GROUPS_SQL = """
+    SELECT sh.shedule_id, g.group_id, c.course_id, c.title AS course_title
+    FROM shedule     sh
+    JOIN classes     cl ON cl.class_id = sh.class_id
+    JOIN courses     c  ON c.course_id = cl.course_id
+    JOIN specialties sp ON sp.spec_id  = c.spec_id
+    JOIN groups      g  ON g.spec_id   = sp.spec_id
+    WHERE $1::text IS NULL OR cl.tag = $1
+"""
+
+
+async def snapshot_version(pool) -> str:
+    return await pool.fetchval(SNAPSHOT_VERSION_SQL)
+
+
+def _csr(rows, cols, n_rows: int):
+    """Разреженная матрица (rows, cols) в формате CSR: indptr и индексы столбцов по строкам."""
+    order = np.lexsort((cols, rows))
+    return np.searchsorted(rows[order], np.arange(n_rows + 1)), cols[order]
+
+
+def _csr_gather(indptr, indices, rows):
+    """Столбцы всех заданных строк CSR одним массивом."""
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    total = int(lengths.sum())
+    if not total:
+        return indices[:0]
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+    return indices[offsets]
+
+
+class AttendanceSnapshot:
+    """
+    students — (student_id, group_id[, full_name]), schedule_groups — строки
+    SNAPSHOT_SCHEDULE_GROUPS_SQL, attended — (student_id, shedule_id) с presence.
+    views — какие CSR-представления строить (см. описание модуля).
+    """
+
+    def __init__(self, students, schedule_groups, attended, version: str, views=("schedules",)):
+        self.version = version
+        self.views = frozenset(views)
+        self.loaded_at = datetime.now()
+
+        sid = np.fromiter((r[0] for r in students), np.int64, len(students))
+        gid = np.fromiter((r[1] if r[1] is not None else -1 for r in students), np.int64, len(students))
+        order = np.argsort(sid)
+        self.student_ids, gid = sid[order], gid[order]
+        self.student_names = [students[i][2] for i in order] if students and len(students[0]) > 2 else []
+
+        sg_sch = np.fromiter((r[0] for r in schedule_groups), np.int64, len(schedule_groups))
+        sg_grp = np.fromiter((r[1] for r in schedule_groups), np.int64, len(schedule_groups))
+        self.schedule_ids = np.unique(sg_sch)
+        self.group_ids = np.unique(np.concatenate([gid[gid >= 0], sg_grp]))
+        n_students, n_sched, n_groups = len(self.student_ids), len(self.schedule_ids), len(self.group_ids)
+        self.n_groups = n_groups
+
+        sch_idx = np.searchsorted(self.schedule_ids, sg_sch)
+        self.schedule_course = np.zeros(n_sched, np.int64)
+        self.schedule_course[sch_idx] = np.fromiter(
+            (r[2] for r in schedule_groups), np.int64, len(schedule_groups)
+        )
+        self.course_titles = {r[2]: r[3] for r in schedule_groups}
+
+        self.student_group = np.where(gid >= 0, np.searchsorted(self.group_ids, gid), -1)
+        # пары расписание × группа, закодированные одним числом
+        pairs = np.unique(sch_idx * max(n_groups, 1) + np.searchsorted(self.group_ids, sg_grp))
+        p_sch, p_grp = pairs // max(n_groups, 1), pairs % max(n_groups, 1)
+
+        a_sid = np.fromiter((r[0] for r in attended), np.int64, len(attended))
+        a_sch = np.fromiter((r[1] for r in attended), np.int64, len(attended))
+        if len(attended) and n_students and n_sched:
+            st = np.searchsorted(self.student_ids, a_sid).clip(0, n_students - 1)
+            sc = np.searchsorted(self.schedule_ids, a_sch).clip(0, n_sched - 1)
+            known = (self.student_ids[st] == a_sid) & (self.schedule_ids[sc] == a_sch)
+            st, sc = st[known], sc[known]
+            # посещение учитывается, только если расписание принадлежит группе студента
+            grp = self.student_group[st]
+            own = (grp >= 0) & np.isin(sc * max(n_groups, 1) + grp, pairs)
+            st, sc = st[own], sc[own]
+        else:
+            st = sc = np.zeros(0, np.int64)
+
+        if "schedules" in self.views:
+            self.sg_indptr, self.sg_groups = _csr(p_sch, p_grp, n_sched)
+            self.sa_indptr, self.sa_students = _csr(sc, st, n_sched)
+        if "groups" in self.views:
+            members = np.nonzero(self.student_group >= 0)[0]
+            self.gst_indptr, self.gst_students = _csr(self.student_group[members], members, n_groups)
+            self.gs_indptr, self.gs_schedules = _csr(p_grp, p_sch, n_groups)
+            self.att_indptr, self.att_schedules = _csr(st, sc, n_students)
+
+    @classmethod
+    async def load(cls, pool, *, tag: str | None = None, names: bool = False,
+                   views=("schedules",)) -> "AttendanceSnapshot":
+        """Читает источники в одном снимке REPEATABLE READ; tag — только занятия с этим тегом."""
+        async with pool.acquire() as conn:
+            async with conn.transaction(isolation="repeatable_read", readonly=True):
+                version = await conn.fetchval(SNAPSHOT_VERSION_SQL)
+                students = await conn.fetch(
+                    "SELECT student_id, group_id, full_name FROM students" if names
+                    else "SELECT student_id, group_id FROM students"
+                )
+                schedule_groups = await conn.fetch(SNAPSHOT_SCHEDULE_GROUPS_SQL, tag)
+                attended = await conn.fetch(
+                    "SELECT student_id, shedule_id FROM attendances WHERE presence"
+                )
+        # сборка массивов — в отдельном потоке, чтобы не блокировать цикл событий
+        return await asyncio.to_thread(cls, students, schedule_groups, attended, version, views)
+
+    def attendance(self, lecture_ids) -> dict[int, tuple[int, int]]:
+        """{student_id: (посещено, запланировано)} по расписаниям lecture_ids; вид "schedules"."""
+        if not len(self.schedule_ids):
+            return {}
+        wanted = np.asarray(sorted(lecture_ids), dtype=np.int64)
+        rows = np.searchsorted(self.schedule_ids, wanted).clip(0, len(self.schedule_ids) - 1)
+        rows = rows[self.schedule_ids[rows] == wanted]
+
+        planned_by_group = np.bincount(
+            _csr_gather(self.sg_indptr, self.sg_groups, rows), minlength=self.n_groups
+        )
+        planned = np.where(self.student_group >= 0, planned_by_group[self.student_group], 0)
+        attended = np.bincount(
+            _csr_gather(self.sa_indptr, self.sa_students, rows), minlength=len(self.student_ids)
+        )
+        hit = np.nonzero(planned)[0]
+        return {
+            int(self.student_ids[i]): (int(attended[i]), int(planned[i]))
+            for i in hit
+        }
+
+    def group_hours(self, group_id: int):
+        """
+        Плановые и посещённые часы одной группы по курсам и её студенты —
+        как fetch_neo4j_planned_hours, fetch_neo4j_attended_hours и
+        fetch_neo4j_students в app_3; вид "groups", снимок с names=True.
+        """
+        g = int(np.searchsorted(self.group_ids, group_id))
+        if g >= len(self.group_ids) or self.group_ids[g] != group_id:
+            return {}, {}, {}
+
+        members = self.gst_students[self.gst_indptr[g]:self.gst_indptr[g + 1]]
+        students = {int(self.student_ids[i]): self.student_names[i] for i in members}
+        schedules = self.gs_schedules[self.gs_indptr[g]:self.gs_indptr[g + 1]]
+        courses, lectures = np.unique(self.schedule_course[schedules], return_counts=True)
+        if not len(members) or not len(courses):
+            return {}, {}, students
+
+        planned = {
+            (sid, int(course)): {
+                "course_title":  self.course_titles[int(course)],
+                "planned_hours": int(count) * 2,
+            }
+            for sid in students
+            for course, count in zip(courses, lectures)
+        }
+
+        starts = self.att_indptr[members]
+        lengths = self.att_indptr[members + 1] - starts
+        total = int(lengths.sum())
+        attended = {}
+        if total:
+            offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+            owners = np.repeat(np.arange(len(members)), lengths)
+            course_pos = np.searchsorted(courses, self.schedule_course[self.att_schedules[offsets]])
+            keys, counts = np.unique(owners * len(courses) + course_pos, return_counts=True)
+            for key, count in zip(keys, counts):
+                member, pos = divmod(int(key), len(courses))
+                attended[(int(self.student_ids[members[member]]), int(courses[pos]))] = int(count) * 2
+        return planned, attended, students
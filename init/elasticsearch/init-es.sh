@@ -1,19 +1,18 @@
 #!/bin/bash
-# Создаем индекс "materials" с заданным mapping для полей
-curl -X PUT "http://elasticsearch:9200/materials" \
+# Индекс версионируется: данные лежат в materials_vN, сервисы обращаются к алиасу "materials".
+# Новая версия строится командой `python main.py reindex-materials` и подменяет алиас атомарно.
+curl -X PUT "http://elasticsearch:9200/materials_v1" \
+  -H 'Content-Type: application/json' -d @/init/materials-index.json && echo ""
+
+curl -X POST "http://elasticsearch:9200/_aliases" \
   -H 'Content-Type: application/json' -d '{
-    "mappings": {
-      "properties": {
-        "material_id": { "type": "integer" },
-        "class_id":    { "type": "integer" },
-        "title":       { "type": "text" },
-        "content":     { "type": "text" }
-      }
-    }
+    "actions": [
+      { "add": { "index": "materials_v1", "alias": "materials", "is_write_index": true } }
+    ]
 }' && echo ""
 
 # Материал 1: Введение в программирование (Лекция)
-curl -X POST "http:/elasticsearch:9200/materials/_doc/1" \
+curl -X POST "http://elasticsearch:9200/materials/_doc/1" \
   -H 'Content-Type: application/json' -d '{
     "material_id": 1,
     "class_id": 1,
@@ -102,4 +101,4 @@ curl -X POST "http://elasticsearch:9200/materials/_doc/10" \
     "content": "Лекция \"Статистика: основы\" представляет собой подробное введение в теоретические аспекты статистики и методы анализа данных. В материале подробно рассматриваются понятия выборки и генеральной совокупности, рассчитываются среднее значение, дисперсия и стандартное отклонение. Также обсуждаются методы построения распределений, регрессионного анализа и проверка статистических гипотез. Студенты знакомятся с практическими примерами применения статистических методов для анализа данных в исследованиях и бизнес-аналитике, что является важным навыком в современной науке."
 }' && echo ""
 
-echo "ElasticSearch индекс 'materials' создан, и все материалы успешно загружены."
+echo "ElasticSearch индекс 'materials_v1' (алиас 'materials') создан, и все материалы успешно загружены."
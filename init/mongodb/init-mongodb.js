@@ -131,4 +131,26 @@ db.universities.insertMany([
   { university_id: 10, name: "Университет J", institutes: [] }
 ]);
 
+// плоская коллекция кафедр (документ на кафедру) для индексного поиска по department_id;
+// дальше её поддерживает main.py (sync_departments_collection)
+db.departments.drop();
+db.universities.aggregate([
+  { $unwind: "$institutes" },
+  { $unwind: "$institutes.departments" },
+  { $project: {
+      _id: 0,
+      department_id: "$institutes.departments.department_id",
+      name: "$institutes.departments.name",
+      head: "$institutes.departments.head",
+      phone: "$institutes.departments.phone",
+      institute_id: "$institutes.institute_id",
+      university_id: 1
+  } },
+  { $out: "departments" }
+]);
+db.departments.createIndex({ department_id: 1 }, { unique: true });
+
+// версия справочника кафедр: app_1 перечитывает кафедры, когда она меняется
+db.meta.updateOne({ _id: "departments" }, { $inc: { version: 1 } }, { upsert: true });
+
 print("Инициализация MongoDB завершена. Всего университетов: " + db.universities.countDocuments());
@@ -0,0 +1,57 @@
+-- Журнал изменений (outbox) для инкрементальной синхронизации PostgreSQL → Neo4j.
+-- Выполняется после init-postgres.sql; скрипт идемпотентен, его же применяет main.py.
+
+CREATE TABLE IF NOT EXISTS graph_outbox (
+  id BIGSERIAL PRIMARY KEY,
+  entity TEXT NOT NULL,          -- имя таблицы-источника
+  op CHAR(1) NOT NULL,           -- I / U / D
+  payload JSONB NOT NULL,        -- строка целиком (для D — старая версия)
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Водяной знак: id последней применённой к графу записи журнала
+CREATE TABLE IF NOT EXISTS graph_sync_state (
+  name TEXT PRIMARY KEY,
+  watermark BIGINT NOT NULL DEFAULT 0,
+  synced_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Триггеры уровня оператора с transition-таблицами: COPY на миллион строк
+-- даёт один вызов функции, а не миллион. courses — ради course_title и
+-- spec_id в узлах и связях Schedule
+CREATE OR REPLACE FUNCTION graph_outbox_capture() RETURNS trigger AS $$
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    INSERT INTO graph_outbox (entity, op, payload)
+    SELECT TG_TABLE_NAME, 'D', to_jsonb(o) FROM old_rows AS o;
+  ELSE
+    INSERT INTO graph_outbox (entity, op, payload)
+    SELECT TG_TABLE_NAME, left(TG_OP, 1), to_jsonb(n) FROM new_rows AS n;
+  END IF;
+  RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+  t TEXT;
+BEGIN
+  FOREACH t IN ARRAY ARRAY['groups', 'students', 'courses', 'classes', 'shedule', 'attendances'] LOOP
+    EXECUTE format(
+      'CREATE OR REPLACE TRIGGER %I AFTER INSERT ON %I
+         REFERENCING NEW TABLE AS new_rows
+         FOR EACH STATEMENT EXECUTE FUNCTION graph_outbox_capture()',
+      t || '_outbox_ins', t);
+    EXECUTE format(
+      'CREATE OR REPLACE TRIGGER %I AFTER UPDATE ON %I
+         REFERENCING NEW TABLE AS new_rows
+         FOR EACH STATEMENT EXECUTE FUNCTION graph_outbox_capture()',
+      t || '_outbox_upd', t);
+    EXECUTE format(
+      'CREATE OR REPLACE TRIGGER %I AFTER DELETE ON %I
+         REFERENCING OLD TABLE AS old_rows
+         FOR EACH STATEMENT EXECUTE FUNCTION graph_outbox_capture()',
+      t || '_outbox_del', t);
+  END LOOP;
+END
+$$;
@@ -0,0 +1,55 @@
+-- Недельные агрегаты посещаемости: плановые и посещённые занятия студента
+-- по каждому занятию (class) курса за неделю. Любое окно дат складывается из
+-- целых недель агрегата и не более чем двух неполных недель по сырым данным.
+-- Выполняется после init-postgres.sql; скрипт идемпотентен, его же применяет main.py.
+
+-- Пересчёт строк затронутых студентов и занятий; NULL, NULL — полная пересборка
+CREATE OR REPLACE FUNCTION refresh_attendance_rollup(p_students INT[], p_classes INT[])
+RETURNS INT AS $$
+DECLARE
+  full_rebuild BOOLEAN := p_students IS NULL AND p_classes IS NULL;
+  n INT;
+BEGIN
+  IF full_rebuild THEN
+    TRUNCATE attendance_rollup;
+  ELSE
+    DELETE FROM attendance_rollup
+    WHERE student_id = ANY(p_students) OR class_id = ANY(p_classes);
+  END IF;
+
+  INSERT INTO attendance_rollup (student_id, class_id, course_id, week, planned, attended)
+  SELECT s.student_id, cl.class_id, cl.course_id,
+         date_trunc('week', sh.start_time)::date,
+         count(*),
+         count(*) FILTER (WHERE a.presence)
+  FROM students s
+  JOIN groups  g  ON g.group_id   = s.group_id
+  JOIN courses c  ON c.spec_id    = g.spec_id
+  JOIN classes cl ON cl.course_id = c.course_id
+  JOIN shedule sh ON sh.class_id  = cl.class_id
+  LEFT JOIN attendances a ON a.student_id = s.student_id AND a.shedule_id = sh.shedule_id
+  WHERE sh.start_time IS NOT NULL
+    AND (full_rebuild OR s.student_id = ANY(p_students) OR cl.class_id = ANY(p_classes))
+  GROUP BY 1, 2, 3, 4;
+  GET DIAGNOSTICS n = ROW_COUNT;
+  RETURN n;
+END
+$$ LANGUAGE plpgsql;
+
+DO $$
+BEGIN
+  IF to_regclass('attendance_rollup') IS NULL THEN
+    CREATE TABLE attendance_rollup (
+      student_id INT  NOT NULL,
+      class_id   INT  NOT NULL,
+      course_id  INT  NOT NULL,
+      week       DATE NOT NULL,     -- понедельник недели
+      planned    INT  NOT NULL,
+      attended   INT  NOT NULL,
+      PRIMARY KEY (student_id, class_id, week)
+    );
+    CREATE INDEX attendance_rollup_class_week ON attendance_rollup (class_id, week);
+    PERFORM refresh_attendance_rollup(NULL, NULL);
+  END IF;
+END
+$$;
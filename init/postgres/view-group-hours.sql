@@ -0,0 +1,19 @@
+-- Часы по спецзанятиям ('специальная') для каждой пары студент × курс —
+-- готовый ответ /api/group-hours. Строится по недельным агрегатам
+-- (rollup-attendance.sql), поэтому пересчёт не читает сырые посещения.
+-- Выполняется после rollup-attendance.sql; скрипт идемпотентен, его же применяет main.py.
+-- Обновление: REFRESH MATERIALIZED VIEW CONCURRENTLY group_hours_mv (нужен уникальный индекс).
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS group_hours_mv AS
+SELECT s.group_id, r.student_id, s.full_name, r.course_id, c.title AS course_title,
+       sum(r.planned) * 2  AS planned_hours,
+       sum(r.attended) * 2 AS attended_hours
+FROM attendance_rollup r
+JOIN students s  ON s.student_id = r.student_id
+JOIN classes  cl ON cl.class_id  = r.class_id
+JOIN courses  c  ON c.course_id  = r.course_id
+WHERE cl.tag = 'специальная'
+GROUP BY s.group_id, r.student_id, s.full_name, r.course_id, c.title;
+
+CREATE UNIQUE INDEX IF NOT EXISTS group_hours_mv_pk ON group_hours_mv (student_id, course_id);
+CREATE INDEX IF NOT EXISTS group_hours_mv_group ON group_hours_mv (group_id);
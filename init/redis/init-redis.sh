@@ -2,17 +2,28 @@
 # Очистка Redis
 redis-cli FLUSHALL
 
-# Вставка 10 записей студентов в кэш Redis
-redis-cli SET student:1 "{\"student_id\":1, \"full_name\": \"Мартынова Лия\", \"code\": \"Ст-2022-001\", \"group_id\": 1}"
-redis-cli SET student:2 "{\"student_id\":2, \"full_name\": \"Осипов Илья\", \"code\": \"Ст-2022-002\", \"group_id\": 1}"
-redis-cli SET student:3 "{\"student_id\":3, \"full_name\": \"Ершов Александр\", \"code\": \"Ст-2022-003\", \"group_id\": 1}"
-redis-cli SET student:4 "{\"student_id\":4, \"full_name\": \"Иванов Сергей\", \"code\": \"Ст-2022-004\", \"group_id\": 2}"
-redis-cli SET student:5 "{\"student_id\":5, \"full_name\": \"Петрова Анна\", \"code\": \"Ст-2022-005\", \"group_id\": 2}"
-redis-cli SET student:6 "{\"student_id\":6, \"full_name\": \"Сидоров Максим\", \"code\": \"Ст-2022-006\", \"group_id\": 3}"
-redis-cli SET student:7 "{\"student_id\":7, \"full_name\": \"Кузнецова Ольга\", \"code\": \"Ст-2022-007\", \"group_id\": 3}"
-redis-cli SET student:8 "{\"student_id\":8, \"full_name\": \"Новиков Роман\", \"code\": \"Ст-2022-008\", \"group_id\": 4}"
-redis-cli SET student:9 "{\"student_id\":9, \"full_name\": \"Фролова Светлана\", \"code\": \"Ст-2022-009\", \"group_id\": 5}"
-redis-cli SET student:10 "{\"student_id\":10, \"full_name\": \"Смирнова Елена\", \"code\": \"Ст-2022-010\", \"group_id\": 6}"
+# Вставка 10 записей студентов в кэш Redis (формат сущностного кэша app_1: student:<id>)
+redis-cli SET student:1 "{\"student_id\":1, \"full_name\": \"Мартынова Лия\", \"code\": \"Ст-2022-001\", \"group\": \"БСБО-03-22\", \"specialty\": \"Компьютерные науки\", \"dept_id\": 1}" EX 604800
+redis-cli SET student:2 "{\"student_id\":2, \"full_name\": \"Осипов Илья\", \"code\": \"Ст-2022-002\", \"group\": \"БСБО-03-22\", \"specialty\": \"Компьютерные науки\", \"dept_id\": 1}" EX 604800
+redis-cli SET student:3 "{\"student_id\":3, \"full_name\": \"Ершов Александр\", \"code\": \"Ст-2022-003\", \"group\": \"БСБО-03-22\", \"specialty\": \"Компьютерные науки\", \"dept_id\": 1}" EX 604800
+redis-cli SET student:4 "{\"student_id\":4, \"full_name\": \"Иванов Сергей\", \"code\": \"Ст-2022-004\", \"group\": \"БСБО-04-22\", \"specialty\": \"Программная инженерия\", \"dept_id\": 2}" EX 604800
+redis-cli SET student:5 "{\"student_id\":5, \"full_name\": \"Петрова Анна\", \"code\": \"Ст-2022-005\", \"group\": \"БСБО-04-22\", \"specialty\": \"Программная инженерия\", \"dept_id\": 2}" EX 604800
+redis-cli SET student:6 "{\"student_id\":6, \"full_name\": \"Сидоров Максим\", \"code\": \"Ст-2022-006\", \"group\": \"БСБО-05-22\", \"specialty\": \"Экономика\", \"dept_id\": 3}" EX 604800
+redis-cli SET student:7 "{\"student_id\":7, \"full_name\": \"Кузнецова Ольга\", \"code\": \"Ст-2022-007\", \"group\": \"БСБО-05-22\", \"specialty\": \"Экономика\", \"dept_id\": 3}" EX 604800
+redis-cli SET student:8 "{\"student_id\":8, \"full_name\": \"Новиков Роман\", \"code\": \"Ст-2022-008\", \"group\": \"БСБО-06-22\", \"specialty\": \"Менеджмент\", \"dept_id\": 4}" EX 604800
+redis-cli SET student:9 "{\"student_id\":9, \"full_name\": \"Фролова Светлана\", \"code\": \"Ст-2022-009\", \"group\": \"БСБО-07-22\", \"specialty\": \"Прикладная математика\", \"dept_id\": 5}" EX 604800
+redis-cli SET student:10 "{\"student_id\":10, \"full_name\": \"Смирнова Елена\", \"code\": \"Ст-2022-010\", \"group\": \"БСБО-08-22\", \"specialty\": \"Чистая математика\", \"dept_id\": 6}" EX 604800
 
+# Названия кафедр (dept:<id>)
+redis-cli SET dept:1 "{\"department_id\":1, \"name\": \"Кафедра программирования\"}" EX 604800
+redis-cli SET dept:2 "{\"department_id\":2, \"name\": \"Кафедра информационных систем\"}" EX 604800
+redis-cli SET dept:3 "{\"department_id\":3, \"name\": \"Кафедра менеджмента\"}" EX 604800
+redis-cli SET dept:4 "{\"department_id\":4, \"name\": \"Кафедра финансов\"}" EX 604800
+redis-cli SET dept:5 "{\"department_id\":5, \"name\": \"Кафедра теоретической математики\"}" EX 604800
+redis-cli SET dept:6 "{\"department_id\":6, \"name\": \"Кафедра прикладной математики\"}" EX 604800
+redis-cli SET dept:7 "{\"department_id\":7, \"name\": \"Кафедра общей физики\"}" EX 604800
+redis-cli SET dept:8 "{\"department_id\":8, \"name\": \"Кафедра экспериментальной физики\"}" EX 604800
+redis-cli SET dept:9 "{\"department_id\":9, \"name\": \"Кафедра химии\"}" EX 604800
+redis-cli SET dept:10 "{\"department_id\":10, \"name\": \"Кафедра биологии\"}" EX 604800
 
 echo "Инициализация Redis завершена."
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Оценка hit rate кэша сервисов на воспроизведённом access-логе.
+
+Читает строки access-лога uvicorn/шлюза вида
+    ... "GET /report?term=...&start=...&end=... HTTP/1.1" 200 OK
+и сравнивает старую схему ключей (str(arg), 404 не кэшируются)
+с канонической (generate_cache_key сервисов + кэширование 404).
+Кэш считается неограниченным по объёму и времени жизни.
+Зависимости сервисов (FastAPI, драйверы БД) не нужны: функции ключей
+берутся из их исходников.
+
+    python replay_cache_log.py logs/gateway/access.log
+"""
+
+import argparse
+import ast
+import hashlib
+import os
+import re
+from collections import Counter
+from datetime import date, datetime
+from urllib.parse import parse_qs, unquote, urlsplit
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# сервис → исходник с его generate_cache_key
+CACHE_KEY_SOURCES = {
+    "report": os.path.join(BASE_DIR, "app_1", "main_1.py"),
+    "course_attendance": os.path.join(BASE_DIR, "app_2", "main_2.py"),
+    "group_hours": os.path.join(BASE_DIR, "app_3", "main_3.py"),
+}
+# определения верхнего уровня, от которых зависит generate_cache_key
+CACHE_KEY_DEFINITIONS = {
+    "MAX_CACHE_KEY_LENGTH", "DATE_ARG_RE", "normalize_term", "parse_period_date",
+    "canonical_cache_arg", "generate_cache_key",
+}
+
+REQUEST_RE = re.compile(r'"GET (?P<target>\S+) HTTP/[\d.]+"\s+(?P<status>\d{3})')
+
+
+def legacy_cache_key(prefix: str, *args) -> str:
+    """Схема ключей до канонизации: str() каждого аргумента."""
+    return ":".join([prefix] + [str(arg) for arg in args])
+
+
+def request_cache_args(target: str):
+    """(сервис, префикс, аргументы) для кэшируемого запроса или None."""
+    url = urlsplit(target)
+    path = unquote(url.path)
+    params = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+    if path in ("/report", "/api/report"):
+        return "report", (
+            params.get("term", "введение"),
+            params.get("start", "2023-09-01"),
+            params.get("end", "2023-10-16"),
+        )
+    if path.startswith("/api/course-attendance/"):
+        return "course_attendance", (
+            path.rsplit("/", 1)[1],
+            params.get("year"),
+            params.get("semester"),
+            params.get("requirements"),
+        )
+    if path.startswith("/api/group-hours/"):
+        return "group_hours", (path.rsplit("/", 1)[1],)
+    return None
+
+
+def _defined_name(node):
+    if isinstance(node, ast.FunctionDef):
+        return node.name
+    if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+        return node.targets[0].id
+    if isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name):
+        return node.target.id
+    return None
+
+
+def load_cache_key_function(path: str):
+    """generate_cache_key сервиса: нужные определения из исходника без импорта модуля."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    body = [node for node in tree.body if _defined_name(node) in CACHE_KEY_DEFINITIONS]
+    namespace = {"re": re, "hashlib": hashlib, "date": date, "datetime": datetime}
+    exec(compile(ast.Module(body=body, type_ignores=[]), path, "exec"), namespace)
+    return namespace["generate_cache_key"]
+
+
+def replay(lines) -> dict:
+    canonical_keys = {prefix: load_cache_key_function(path) for prefix, path in CACHE_KEY_SOURCES.items()}
+    legacy_seen, canonical_seen = set(), set()
+    stats = Counter()
+    for line in lines:
+        m = REQUEST_RE.search(line)
+        if not m:
+            continue
+        parsed = request_cache_args(m["target"])
+        if parsed is None:
+            continue
+        prefix, args = parsed
+        status = int(m["status"])
+        if status not in (200, 404):
+            continue
+        stats["requests"] += 1
+        stats[f"status_{status}"] += 1
+
+        legacy_key = legacy_cache_key(prefix, *args)
+        if status == 200:
+            if legacy_key in legacy_seen:
+                stats["legacy_hits"] += 1
+            legacy_seen.add(legacy_key)
+
+        canonical_key = canonical_keys[prefix](prefix, *args)
+        if canonical_key in canonical_seen:
+            stats["canonical_hits"] += 1
+        canonical_seen.add(canonical_key)
+
+    stats["legacy_keys"] = len(legacy_seen)
+    stats["canonical_keys"] = len(canonical_seen)
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("log", help="путь к access-логу")
+    args = parser.parse_args()
+
+    with open(args.log, encoding="utf-8", errors="replace") as f:
+        stats = replay(f)
+
+    total = stats["requests"] or 1
+    print(f"Запросов: {stats['requests']} (200: {stats['status_200']}, 404: {stats['status_404']})")
+    print(f"Старые ключи:        {stats['legacy_keys']:>8}  hit rate {stats['legacy_hits'] / total:6.1%}")
+    print(f"Канонические ключи:  {stats['canonical_keys']:>8}  hit rate {stats['canonical_hits'] / total:6.1%}")
+
+
+if __name__ == "__main__":
+    main()